@@ -1,12 +1,30 @@
 import random
 
 import streamlit as st
+import checkpoint
+from background import CANCELLED, DONE, SimulationJob
+from cache import ResultCache, prefix_key, simulation_key
+from charts import downsample, render_heatmap, render_tornado
 from config import Config
 from classes import Contract,Lootbox,Player,Dungeon,Game,PlayableGame
+from events import EVENTS, LOG_LEVELS, LogIndex
+from memory import memory_report, result_nbytes
+from population import ARCHETYPES, PERCENTILES, summarize
+from profiling import Profiler
+import sensitivity
+from simulate import build_game, run_cohort_scenario
 import pandas as pd
 # Global variable for config
 config = None
 
+# Memory the finished simulations shared by all sessions may take up
+RESULT_CACHE_MB = 256
+
+@st.cache_resource
+def get_result_cache():
+    """Finished simulations shared by all sessions of this server."""
+    return ResultCache(maxsize=8, max_bytes=RESULT_CACHE_MB * 1024 * 1024, sizeof=result_nbytes)
+
 # Function to create a Streamlit sidebar for user input
 def normalize_probabilities(probabilities):
     """Normalize probabilities to sum to 1.0"""
@@ -17,16 +35,35 @@ def normalize_probabilities(probabilities):
         return {k: 1.0/num_items for k in probabilities}
     return {k: v/total for k, v in probabilities.items()}
 
+# Stats sampling choices for the recorder: every N rounds or once per day
+RECORD_OPTIONS = {
+    "Every round": 1,
+    "Every 5 rounds": 5,
+    "End of each day": 'day'
+}
+
 def user_input():
     st.sidebar.header("Game Configuration")
+    # Widgets are batched in a form so moving a slider doesn't rerun the app until applied
+    form = st.sidebar.form("game_configuration")
 
     # Add simulation settings
-    with st.sidebar.expander("Simulation Settings", expanded=False):
+    with form.expander("Simulation Settings", expanded=False):
         rounds_per_day = st.slider("Rounds Per Day", 1, 48, 10)
         simulation_days = st.slider("Number of Days", 1, 180, 10)
+        log_level = st.selectbox("Action Log Detail", list(LOG_LEVELS), index=2,
+                                 help="'debug' adds win chances and skipped rounds; 'off' keeps no log")
+        sampling = st.selectbox("Stats Sampling", list(RECORD_OPTIONS), index=0,
+                                help="How often player stats are recorded for the charts")
+        seed = st.number_input("Random Seed", min_value=0, value=0, step=1,
+                               help="Runs with the same settings and seed give the same results")
+        memory_budget = st.number_input("Memory Budget (MB)", min_value=0, value=0, step=16,
+                                        help="Caps the action log and stats history of a run; 0 means no limit. "
+                                             "The log then keeps recent entries plus a sample of older ones, "
+                                             "and stats are sampled less often if needed.")
 
     # Input fields for Contract drop chances
-    with st.sidebar.expander("Contract Drop Chances", expanded=False):
+    with form.expander("Contract Drop Chances", expanded=False):
         contract_probs = {
             'epic': st.slider("Contract: Epic Material Drop Chance", 0.0, 1.0, 0.11),
             'rare': st.slider("Contract: Rare Material Drop Chance", 0.0, 1.0, 0.89)
@@ -37,7 +74,7 @@ def user_input():
             st.text(f"{k}: {v:.3f}")
 
     # Input fields for Lootbox drop chances
-    with st.sidebar.expander("Lootbox Drop Chances", expanded=False):
+    with form.expander("Lootbox Drop Chances", expanded=False):
         lootbox_probs = {
             'legendary': st.slider("Lootbox: Legendary Drop Chance", 0.0, 1.0, 0.02),
             'epic': st.slider("Lootbox: Epic Drop Chance", 0.0, 1.0, 0.09),
@@ -51,7 +88,7 @@ def user_input():
             st.text(f"{k}: {v:.3f}")
 
     # Base completion rates per tier
-    with st.sidebar.expander("Base Completion Rates", expanded=False):
+    with form.expander("Base Completion Rates", expanded=False):
         base_completion_rates = {
             1: st.slider("Tier 1 Base Completion Rate", 0.0, 1.0, 0.8),
             2: st.slider("Tier 2 Base Completion Rate", 0.0, 1.0, 0.6),
@@ -59,7 +96,7 @@ def user_input():
         }
         
     # Gear bonus values in separate dropdown
-    with st.sidebar.expander("Gear Bonus Values", expanded=False):
+    with form.expander("Gear Bonus Values", expanded=False):
         gear_bonus_values = {
             'legendary': st.slider("Legendary Gear Bonus", 0.0, 0.25, 0.05),
             'epic': st.slider("Epic Gear Bonus", 0.0, 0.20, 0.03),
@@ -68,12 +105,12 @@ def user_input():
         }
 
     # Dungeon tier choice probabilities
-    st.sidebar.subheader("Dungeon Tier Choice Probabilities")
+    form.subheader("Dungeon Tier Choice Probabilities")
     
     # Dungeon Material Drop Chances per Tier
     dungeon_material_drop_chances = {}
     for tier in [1, 2, 3]:
-        with st.sidebar.expander(f"Tier {tier} Material Drop Chances", expanded=False):
+        with form.expander(f"Tier {tier} Material Drop Chances", expanded=False):
             tier_probs = {
                 'legendary': st.slider(f"T{tier} Material: Legendary", 0.0, 1.0, 0.02),
                 'epic': st.slider(f"T{tier} Material: Epic", 0.0, 1.0, 0.09),
@@ -89,7 +126,7 @@ def user_input():
     # Dungeon Loot Drop Chances per Tier
     dungeon_loot_drop_chances = {}
     for tier in [1, 2, 3]:
-        with st.sidebar.expander(f"Tier {tier} Loot Drop Chances", expanded=False):
+        with form.expander(f"Tier {tier} Loot Drop Chances", expanded=False):
             tier_probs = {
                 'legendary': st.slider(f"T{tier} Loot: Legendary", 0.0, 1.0, 0.02),
                 'epic': st.slider(f"T{tier} Loot: Epic", 0.0, 1.0, 0.09),
@@ -103,10 +140,10 @@ def user_input():
                 st.text(f"{k}: {v:.3f}")
 
     # Dungeon tier choice probabilities
-    st.sidebar.subheader("Dungeon Tier Choice Probabilities")
+    form.subheader("Dungeon Tier Choice Probabilities")
     
     # Dungeon tier choice probabilities in a collapsible section
-    with st.sidebar.expander("Dungeon Tier Choice Probabilities", expanded=False):
+    with form.expander("Dungeon Tier Choice Probabilities", expanded=False):
         tier_1_probability = st.slider("Tier 1 Probability", 0, 50, 10)
         tier_2_probability = st.slider("Tier 2 Probability", 0, 50, 5)
         tier_3_probability = st.slider("Tier 3 Probability", 0, 50, 1)
@@ -116,16 +153,17 @@ def user_input():
         gear_modifier_tier_2 = st.slider("Gear Modifier for Tier 2", 0.0, 2.0, 0.5)
         gear_modifier_tier_3 = st.slider("Gear Modifier for Tier 3", 0.0, 2.0, 1.0)
 
-        # Update the config with the new values
-        config.dungeon_choice_probabilities['tier_1']['gear_modifier'] = gear_modifier_tier_1
-        config.dungeon_choice_probabilities['tier_2']['gear_modifier'] = gear_modifier_tier_2
-        config.dungeon_choice_probabilities['tier_3']['gear_modifier'] = gear_modifier_tier_3
+    form.form_submit_button("Apply Settings")
 
     # Return the user configuration
     return {
         'simulation_settings': {
             'rounds_per_day': rounds_per_day,
-            'simulation_days': simulation_days
+            'simulation_days': simulation_days,
+            'log_level': log_level,
+            'record_every': RECORD_OPTIONS[sampling],
+            'seed': int(seed),
+            'memory_budget_mb': int(memory_budget) or None
         },
         'contract_material_drop_chances': contract_material_drop_chances,
         'lootbox_loot_drop_chances': lootbox_loot_drop_chances,
@@ -213,13 +251,8 @@ def player_input():
     players = []
     num_players = st.number_input("Number of Players", min_value=1, max_value=5, value=2)
     
-    # Define archetypes
-    archetypes = {
-        "No-Life": (100, 1),
-        "Hardcore": (70, 1),
-        "Casual": (30, 2),
-        "Ultra Casual": (20, 5)
-    }
+    # Archetype defaults, with activity as a percentage
+    archetypes = {name: (int(activity * 100), frequency) for name, (activity, frequency) in ARCHETYPES.items()}
     
     for i in range(num_players):
         with st.expander(f"Player {i+1} Settings", expanded=True):
@@ -264,6 +297,41 @@ def player_input():
     
     return players
 
+def population_input():
+    """Population size, archetype mix and jitter for cohort simulations"""
+    st.header("Population")
+    size = st.number_input("Number of Players", min_value=100, max_value=200000, value=10000, step=1000,
+                           key="population_size")
+    st.write("Archetype mix (shares are normalized)")
+    mix = {}
+    columns = st.columns(len(ARCHETYPES))
+    for column, name in zip(columns, ARCHETYPES):
+        mix[name] = column.number_input(f"{name} %", min_value=0, max_value=100, value=25, key=f"mix_{name}")
+    if sum(mix.values()) == 0:
+        st.warning("Give at least one archetype a share")
+        return None
+    activity_jitter = st.slider("Activity Level Jitter (+/- %)", 0, 50, 10, key="activity_jitter")
+    frequency_jitter = st.slider("Play Frequency Jitter (+/- days)", 0, 3, 0, key="frequency_jitter")
+    return {
+        'size': int(size),
+        'mix': {name: share for name, share in mix.items() if share > 0},
+        'activity_jitter': activity_jitter / 100.0,
+        'frequency_jitter': frequency_jitter
+    }
+
+def show_population_results(engine):
+    """Population-level outcomes of a cohort run"""
+    st.subheader(f"Population of {engine.num_players:,} players after {engine.days_completed} days")
+    summary = summarize(engine).set_index('archetype')
+    metric = st.selectbox("Metric", ['gear_level', 'completions', 'lootboxes_opened', 'pets',
+                                     'yoku', 'pioneer_points', 'skull_tokens', 'epic_materials', 'rare_materials'],
+                          key="population_metric")
+    columns = [f"{metric}_mean"] + [f"{metric}_p{q}" for q in PERCENTILES]
+    st.dataframe(summary[['players'] + columns].round(2), use_container_width=True)
+    history = pd.DataFrame(engine.history).set_index('day')
+    st.line_chart(history[['mean_gear_level', 'mean_completions']])
+    st.line_chart(history[['tier_1_win_rate', 'tier_2_win_rate', 'tier_3_win_rate']])
+
 def show_player_stats(game):
     # Initialize session state for game data if not exists
     if 'game_data' not in st.session_state:
@@ -305,6 +373,259 @@ def show_player_stats(game):
             )
             st.dataframe(pets_df)
 
+def show_action_log(game):
+    """Filterable, paginated view of the game's action log."""
+    st.header("Action Log")
+    log = game.action_log
+    # Build the index once per simulation and reuse it across reruns
+    if st.session_state.get('log_index_game') is not game:
+        st.session_state.log_index = LogIndex(log)
+        st.session_state.log_index_game = game
+    index = st.session_state.log_index
+    if index.size == 0:
+        st.info("The action log is empty (logging may be turned off in Simulation Settings)")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        player_names = st.multiselect("Players", log.player_names)
+        event_names = st.multiselect("Event Types", [event.name for event in EVENTS])
+    with col2:
+        last_day = int(index.columns['day'].max())
+        days = st.slider("Days", 1, max(last_day, 2), (1, last_day))
+        search_term = st.text_input("Filter log messages", "")
+
+    positions = index.query(
+        players=[log.player_names.index(name) for name in player_names] if player_names else None,
+        days=days,
+        event_names=event_names or None,
+        text=search_term
+    )
+
+    page_size = st.selectbox("Entries per page", [50, 100, 500, 1000], index=1)
+    num_pages = max(1, -(-len(positions) // page_size))
+    page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1)
+    st.caption(f"{len(positions)} of {index.size} entries match")
+
+    # Only the current page is rendered to text
+    page_positions = positions[(page - 1) * page_size:page * page_size]
+    st.dataframe(
+        pd.DataFrame(index.rows(page_positions), columns=['Day', 'Round', 'Player', 'Message']),
+        hide_index=True,
+        use_container_width=True
+    )
+
+def run_cached(population_or_players, user_config, simulate, build=None):
+    """Return the cached result for these inputs; on Run Simulation compute it if missing
+
+    With build (a function returning the game before it is run), the run
+    happens on a background thread instead and the result arrives through
+    show_background_run().
+    """
+    settings = user_config['simulation_settings']
+    # Seeded runs are deterministic, so identical inputs can reuse a finished run
+    spec = config.compile()
+    key = simulation_key(spec, population_or_players, settings['seed'], settings)
+    prefix = prefix_key(spec, population_or_players, settings['seed'], settings)
+    results = get_result_cache()
+    result = results.get(key)
+    job = st.session_state.get('sim_job')
+    running = job is not None and not job.finished
+
+    if st.button("Run Simulation", disabled=running) and result is None:
+        # A cached shorter run with the same settings is continued rather than redone
+        base = results.longest_prefix(prefix, settings['simulation_days'])
+        if build is not None:
+            game = checkpoint.fork(base) if base is not None else build()
+            st.session_state.sim_job = SimulationJob(game, settings['simulation_days'], session_profiler(),
+                                                     st.session_state.get('trace_memory', False)).start()
+            st.session_state.sim_job_keys = (key, prefix)
+        elif base is not None:
+            result = checkpoint.fork(base)
+            result.run(days=settings['simulation_days'])
+        else:
+            result = simulate()
+        if result is not None:
+            results.put(key, result, prefix)
+    return key, result
+
+def partial_series(game):
+    """Gear level and completions recorded so far, one row per player and sample"""
+    frames = []
+    for player in game.players:
+        turns, gear = downsample(player.turns, player.gear_levels_over_time, 300)
+        _, completions = downsample(player.turns, player.completions_over_time, 300)
+        frames.append(pd.DataFrame({'Turn': turns, 'Player': player.name, 'Gear Level': gear,
+                                    'Completions': completions}))
+    return pd.concat(frames) if frames else pd.DataFrame()
+
+@st.fragment(run_every=0.5)
+def show_background_run():
+    """Progress and charts of the background run; hands the finished game to the app"""
+    job = st.session_state.get('sim_job')
+    if job is None:
+        return
+    if job.finished:
+        del st.session_state.sim_job
+        if job.status == DONE:
+            key, prefix = st.session_state.sim_job_keys
+            get_result_cache().put(key, job.game, prefix)
+            st.session_state.game_data = job.game
+            st.session_state.game_key = key
+            if job.peak is not None:
+                st.session_state.memory_peaks = {**st.session_state.get('memory_peaks', {}), id(job.game): job.peak}
+        elif job.status == CANCELLED:
+            st.session_state.sim_notice = f"Simulation cancelled after day {job.days_done} of {job.days}"
+        else:
+            st.session_state.sim_notice = f"The simulation failed: {job.error!r}"
+        # Rerun the whole page so the results and the Run Simulation button catch up
+        st.rerun()
+
+    st.progress(job.progress, text=f"Day {job.days_done} of {job.days} ({job.elapsed:.1f}s)")
+    if st.button("Cancel"):
+        job.cancel()
+    series = job.snapshot(partial_series)
+    if not series.empty:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.caption("Gear Level so far")
+            st.line_chart(series, x='Turn', y='Gear Level', color='Player')
+        with col2:
+            st.caption("Total Dungeon Completions so far")
+            st.line_chart(series, x='Turn', y='Completions', color='Player')
+
+def show_game_simulation(user_config):
+    players_config = st.session_state.players_config
+    # Runs go to a background thread; show_background_run() reports on them
+    key, game = run_cached(players_config, user_config, None,
+                           build=lambda: build_game({**user_config, 'players': players_config}))
+    if 'sim_job' in st.session_state:
+        show_background_run()
+    notice = st.session_state.pop('sim_notice', None)
+    if notice:
+        st.info(notice)
+
+    if game is not None:
+        # Store game state after simulation
+        st.session_state.game_data = game
+        st.session_state.game_key = key
+    
+    # Show player stats if we have game data (separate from simulation run)
+    if 'game_data' in st.session_state:
+        if st.session_state.game_key != key:
+            st.info("Showing results for earlier settings; run the simulation to update them")
+        st.session_state.game_data.plot_stats()
+        show_player_stats(st.session_state.game_data)
+
+def show_population_simulation(user_config, population):
+    key, engine = run_cached(population, user_config,
+                             lambda: run_cohort_scenario({**user_config, 'population': population}))
+
+    if engine is not None:
+        st.session_state.population_data = engine
+        st.session_state.population_key = key
+
+    if 'population_data' in st.session_state:
+        if st.session_state.population_key != key:
+            st.info("Showing results for earlier settings; run the simulation to update them")
+        show_population_results(st.session_state.population_data)
+
+def show_sensitivity(user_config):
+    """Which sidebar parameters move the outcomes, from one batch of perturbed runs"""
+    st.header("Sensitivity")
+    population = st.session_state.population
+    players_config = st.session_state.players_config
+    if population is None and not players_config:
+        st.info("Set up players or a population in the Player Setup tab first")
+        return
+    st.caption("Each parameter is moved down and up around its current value with everything else fixed; "
+               "all runs share their seeds, so differences come from the parameter, not the dice.")
+    col1, col2 = st.columns(2)
+    with col1:
+        step = st.slider("Perturbation (+/- %)", 1, 50, 10) / 100
+    with col2:
+        replicates = st.number_input("Replicates per configuration", min_value=2, max_value=50, value=4)
+    scenario = {**user_config, **({'population': population} if population is not None else
+                                  {'players': players_config})}
+    engine = 'cohort' if population is not None else 'game'
+    settings = user_config['simulation_settings']
+    inputs = (simulation_key(config.compile(), population or players_config, settings['seed'], settings),
+              step, replicates)
+    result = st.session_state.get('sensitivity')
+    if st.button("Run Sensitivity Analysis"):
+        count = len([value for value in sensitivity.parameters(scenario).values() if value])
+        with st.spinner(f"Running {(1 + 2 * count) * replicates} simulations..."):
+            table, _ = sensitivity.run_sensitivity(scenario, step=step, replicates=int(replicates),
+                                                   seed=settings['seed'], engine=engine)
+        result = st.session_state.sensitivity = (inputs, table)
+    if result is None:
+        return
+    if result[0] != inputs:
+        st.info("Showing the analysis for earlier settings; run it again to update it")
+    table = result[1]
+
+    metric = st.selectbox("Metric", list(table['metric'].unique()))
+    rows = sensitivity.tornado(table, metric)
+    st.image(render_tornado(rows, metric), caption=f"Largest effects on {metric}", use_column_width=True)
+    st.image(render_heatmap(sensitivity.elasticity_matrix(table)),
+             caption="Elasticity: % change in each metric per % change in each parameter", use_column_width=True)
+    st.dataframe(rows.drop(columns='metric'), hide_index=True, use_container_width=True)
+    st.download_button("Download results (CSV)", table.to_csv(index=False), file_name="sensitivity.csv",
+                       mime="text/csv")
+
+def session_profiler():
+    """This session's Profiler when profiling is switched on in the Performance tab, else None"""
+    if not st.session_state.get('profile_runs'):
+        return None
+    track_allocations = st.session_state.get('profile_allocations', False)
+    profiler = st.session_state.get('profiler')
+    if profiler is None or profiler.track_allocations != track_allocations:
+        profiler = st.session_state.profiler = Profiler(track_allocations=track_allocations)
+    return profiler
+
+def show_performance(profiler):
+    """Per-phase timings of the simulation runs in this session"""
+    st.header("Performance")
+    st.toggle("Profile simulation runs", key="profile_runs",
+              help="Time each phase of running the game, drawing charts and rendering the log. Only this session's runs are counted.")
+    st.checkbox("Track allocations (much slower)", key="profile_allocations")
+
+    if profiler is None:
+        st.info("Switch profiling on, then run a simulation to see where the time goes")
+        return
+    table = profiler.table()
+    if table.empty:
+        st.info("No profiled activity yet; run a simulation")
+        return
+    st.caption("Phases nest (play_turn includes dungeon, add_gear and log), so shares of the run add up to more than 100%.")
+    st.dataframe(table, hide_index=True, use_container_width=True)
+    st.bar_chart(table.set_index('phase')['total_s'])
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download profile (CSV)", table.to_csv(index=False), file_name="profile.csv",
+                           mime="text/csv")
+    with col2:
+        if st.button("Reset counters"):
+            profiler.reset()
+            st.rerun()
+
+def show_memory(game):
+    """Where the memory of the shown simulation went"""
+    st.header("Memory")
+    st.checkbox("Trace peak memory of new runs (slower)", key="trace_memory")
+    if game is None:
+        st.info("Run a simulation to see its memory use")
+        return
+    report = memory_report(game, st.session_state.get('memory_peaks', {}).get(id(game)))
+    structures = ['action_log', 'recorders', 'players', 'streams']
+    st.dataframe(pd.DataFrame({'structure': structures, 'KiB': [report[name] / 1024 for name in structures]}),
+                 hide_index=True, use_container_width=True)
+    if 'peak' in report:
+        st.metric("Peak traced during the run", f"{report['peak'] / 1024 / 1024:.1f} MB")
+    if report.get('log_evicted'):
+        st.caption(f"The action log keeps {report['log_records']:,} of {report['logged_events']:,} entries: "
+                   f"the most recent ones plus a sample of {report['log_sampled']:,} older ones.")
+
 def main():
     global config
     config = Config()
@@ -312,65 +633,56 @@ def main():
     st.title("Game Loop Simulator")
     
     # Create tabs
-    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Rules", "Player Setup", "Simulation", "Action Log", "Play Game"])
+    tab1, tab2, tab3, tab4, tab7, tab6, tab5 = st.tabs(
+        ["Rules", "Player Setup", "Simulation", "Action Log", "Sensitivity", "Performance", "Play Game"])
     
     # Initialize players in session state if not exists
     if 'players_config' not in st.session_state:
         st.session_state.players_config = []
     
     with tab2:
-        st.session_state.players_config = player_input()
+        mode = st.radio("Simulate", ["Individual Players", "Population"], horizontal=True, key="setup_mode")
+        if mode == "Population":
+            st.session_state.population = population_input()
+        else:
+            st.session_state.population = None
+            st.session_state.players_config = player_input()
     
-    with tab3:
-        # Simulation tab
-        user_config = user_input()
-        
-        # Create players with their individual settings
-        game_players = []
-        for p_config in st.session_state.players_config:
-            player = Player(
-                p_config['name'], 
-                config,
-                activity_level=p_config['activity_level'],
-                play_frequency=p_config['play_frequency']
-            )
-            game_players.append(player)
+    # Profiling covers the simulation and action log tabs of this script run
+    # (a background run enables the same profiler on its own thread while it lasts)
+    profiler = session_profiler()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        with tab3:
+            # Simulation tab
+            user_config = user_input()
+            config.update_from_user_input(user_config)
 
-        game = Game(game_players, config, rounds_per_day=user_config['simulation_settings']['rounds_per_day'])
+            if st.session_state.population is not None:
+                show_population_simulation(user_config, st.session_state.population)
+            else:
+                show_game_simulation(user_config)
 
-        if st.button("Run Simulation"):
-            game.run(days=user_config['simulation_settings']['simulation_days'])
-            game.display_stats()
-            game.plot_stats()
-            # Store game state after simulation
-            st.session_state.game_data = game
-        
-        # Show player stats if we have game data (separate from simulation run)
-        if 'game_data' in st.session_state:
-            show_player_stats(st.session_state.game_data)
+        with tab4:
+            if 'game_data' in st.session_state:
+                show_action_log(st.session_state.game_data)
+            else:
+                st.info("Run a simulation to see the action log")
+    finally:
+        if profiler is not None:
+            profiler.disable()
     
+    with tab7:
+        show_sensitivity(user_config)
+
     with tab1:
         show_rules()
-    
-    with tab4:
-        if 'game_data' in st.session_state:
-            st.header("Action Log")
-            # Add a search/filter box
-            search_term = st.text_input("Filter log messages", "")
-            
-            # Filter messages based on search term
-            filtered_logs = st.session_state.game_data.action_log
-            if search_term:
-                filtered_logs = [msg for msg in filtered_logs if search_term.lower() in msg.lower()]
-            
-            # Display logs in a scrollable container
-            log_container = st.container()
-            with log_container:
-                for message in filtered_logs:
-                    st.text(message)
-        else:
-            st.info("Run a simulation to see the action log")
-            
+
+    with tab6:
+        show_performance(profiler)
+        show_memory(st.session_state.get('game_data'))
+
 
     with tab5:
         if not st.session_state.players_config:
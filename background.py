@@ -0,0 +1,96 @@
+"""Run a Game on a background thread, one day at a time.
+
+The app starts a SimulationJob instead of calling Game.run on its script
+thread, keeps the job in session state and polls it: progress is the
+number of days played so far, snapshot() reads the game between two
+days (e.g. the series drawn so far), and cancel() stops the run at the
+next day boundary. Playing a game day by day gives exactly the same
+result as one Game.run call.
+
+    job = SimulationJob(game, days).start()
+    job.progress                    (fraction of days played)
+    job.snapshot(lambda game: ...)  (consistent read while it runs)
+    job.cancel()
+
+A profiler passed to the job is enabled on the job's thread for the whole
+run (see profiling.py); with trace_memory, the run's peak traced memory
+ends up in job.peak.
+"""
+import contextlib
+import threading
+import time
+
+from memory import traced_peak
+
+RUNNING, DONE, CANCELLED, FAILED = 'running', 'done', 'cancelled', 'failed'
+
+
+class SimulationJob:
+    """One Game.run, stepped a day at a time on a daemon thread."""
+    def __init__(self, game, days, profiler=None, trace_memory=False):
+        self.game = game
+        self.days = days
+        self.profiler = profiler
+        self.trace_memory = trace_memory
+        self.first_day = game.days_completed
+        self.status = RUNNING
+        self.error = None
+        self.peak = None
+        self.started = self.finished_at = None
+        self._lock = threading.Lock()  # Held while a day is played
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            with self.profiler or contextlib.nullcontext():
+                if self.trace_memory:
+                    self.peak, _ = traced_peak(self._play)
+                else:
+                    self._play()
+            self.status = CANCELLED if self.game.days_completed < self.days else DONE
+        except Exception as error:
+            self.error = error
+            self.status = FAILED
+        self.finished_at = time.perf_counter()
+
+    def _play(self):
+        while self.game.days_completed < self.days and not self._cancel.is_set():
+            with self._lock:
+                self.game.run(days=self.game.days_completed + 1)
+
+    def cancel(self):
+        """Stop after the day being played."""
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+        return self
+
+    @property
+    def finished(self):
+        return self.status != RUNNING
+
+    @property
+    def days_done(self):
+        return self.game.days_completed
+
+    @property
+    def progress(self):
+        total = self.days - self.first_day
+        return (self.days_done - self.first_day) / total if total > 0 else 1.0
+
+    @property
+    def elapsed(self):
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started if self.started is not None else 0.0
+
+    def snapshot(self, read):
+        """Call read(game) between two days, so it sees a consistent state."""
+        with self._lock:
+            return read(self.game)
@@ -0,0 +1,256 @@
+"""Benchmarks for the simulation hot paths.
+
+Micro benchmarks time one operation in isolation (a drop-table roll,
+add_gear, record_stats, play_turn, rendering the charts); scaling
+benchmarks time Game.run end to end while one axis (players, days,
+rounds per day, log verbosity) moves away from a base point. Each case
+reports the best of several repeats as seconds, operations per second
+(rounds per second for whole runs) and the peak traced memory of one
+extra run under tracemalloc.
+
+Results can be saved as a baseline JSON and later runs compared against
+it: a case regresses when its rate drops, or its peak memory grows, by
+more than the tolerance. Baselines only mean something on the machine
+that recorded them.
+
+Usage:
+    python -m bench --save-baseline                 (record bench_baseline.json)
+    python -m bench                                 (compare, exit status 1 on regressions)
+    python -m bench --quick --only run. -o bench.csv
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import events
+from classes import Contract, Dungeon, Game, Lootbox, Player
+from config import Config
+from streams import CounterStream
+
+BASELINE_PATH = 'bench_baseline.json'
+
+# Base point of the scaling curves and the values each axis takes
+BASE = {'players': 10, 'days': 30, 'rounds_per_day': 10, 'log_level': 'actions'}
+AXES = {
+    'players': [1, 10, 100, 500],
+    'days': [10, 30, 90, 180],
+    'rounds_per_day': [10, 24, 48],
+    'log_level': ['off', 'summary', 'actions', 'debug'],
+}
+QUICK_AXES = {
+    'players': [1, 10, 100],
+    'days': [10, 30],
+    'rounds_per_day': [10, 48],
+    'log_level': ['off', 'debug'],
+}
+ARCHETYPES = [(1.0, 1), (0.7, 1), (0.3, 2), (0.2, 5)]
+
+
+def make_game(players=10, days=30, rounds_per_day=10, log_level='actions', seed=1):
+    """Game with a repeating mix of the four player archetypes."""
+    config = Config()
+    roster = [Player(f"Player {i + 1}", config, *ARCHETYPES[i % len(ARCHETYPES)]) for i in range(players)]
+    return Game(roster, config, rounds_per_day=rounds_per_day, seed=seed,
+                log_level=events.LOG_LEVELS[log_level])
+
+
+# Cases: each builds its state and returns (operation, operations per call)
+
+def roll_case(table, method, n):
+    def make():
+        stream = CounterStream(12345)
+        roll = getattr(table(Config().compile()), method)
+        return lambda: [roll(stream) for _ in range(n)], n
+    return make
+
+
+def dungeon_roll(method):
+    return roll_case(lambda config: Dungeon(2, config), method, 50000)
+
+
+def add_gear_case(n=50000):
+    def make():
+        game = make_game(players=1, log_level='off')
+        player = game.players[0]
+        rarities = ['uncommon', 'rare', 'epic', 'legendary', 'uncommon', 'rare', 'uncommon']
+        return lambda: [player.add_gear(rarities[i % len(rarities)], game) for i in range(n)], n
+    return make
+
+
+def record_stats_case(n=50000):
+    def make():
+        player = make_game(players=1).players[0]
+
+        def op():
+            player.recorder.size = 0
+            for turn in range(n):
+                player.record_stats(turn)
+        player.recorder.reserve(n)
+        return op, n
+    return make
+
+
+def play_turn_case(n=20000):
+    def make():
+        game = make_game(players=1, log_level='off')
+        player = game.players[0]
+
+        def op():
+            player.yoku = player.pioneer_points = 10 ** 9  # Never run out of actions
+            for _ in range(n):
+                game.play_turn(player)
+        return op, n
+    return make
+
+
+def plot_case(players=10, days=30):
+    def make():
+        import charts
+
+        game = make_game(players=players, days=days, log_level='off')
+        game.run(days)
+
+        def op():
+            charts._cache.clear()
+            charts.render_charts(game.players)
+        return op, 1
+    return make
+
+
+def run_case(**params):
+    def make():
+        settings = {**BASE, **params}
+        days = settings.pop('days')
+
+        def op():
+            make_game(**settings).run(days)
+        return op, days * settings['rounds_per_day']
+    return make
+
+
+def cases(quick=False):
+    """name -> case factory, micro benchmarks first."""
+    found = {
+        'roll.dungeon_loot': dungeon_roll('roll_loot'),
+        'roll.dungeon_material': dungeon_roll('roll_material'),
+        'roll.dungeon_pet': dungeon_roll('roll_pet'),
+        'roll.contract_material': roll_case(Contract, 'roll_material', 50000),
+        'roll.lootbox_loot': roll_case(Lootbox, 'roll_loot', 50000),
+        'roll.lootbox_pet': roll_case(Lootbox, 'roll_pet', 50000),
+        'player.add_gear': add_gear_case(),
+        'player.record_stats': record_stats_case(),
+        'game.play_turn': play_turn_case(),
+        'game.plot_stats': plot_case(),
+    }
+    for axis, values in (QUICK_AXES if quick else AXES).items():
+        for value in values:
+            found[f"run.{axis}={value}"] = run_case(**{axis: value})
+    return found
+
+
+def measure(make, repeat=3):
+    """Best time of repeat calls, plus the peak traced memory of one more call."""
+    op, ops = make()
+    op()  # Warm up caches and lazy imports
+    best = min(_timed(op) for _ in range(repeat))
+    tracemalloc.start()
+    try:
+        op()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'seconds': best, 'ops': ops, 'rate': ops / best if best > 0 else float('inf'), 'peak_kib': peak / 1024}
+
+
+def _timed(op):
+    start = time.perf_counter()
+    op()
+    return time.perf_counter() - start
+
+
+def run_benchmarks(only=(), quick=False, repeat=3, progress=None):
+    """Measure every case whose name starts with one of only (all when empty)."""
+    results = {}
+    for name, make in cases(quick).items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(make, repeat)
+        if progress:
+            progress(name, results[name])
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(), 'system': platform.system(),
+            'processor': platform.processor(), 'cpus': os.cpu_count()}
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def regressions(results, baseline, tolerance=0.2):
+    """(name, what, baseline value, current value) for every case that got worse than tolerance allows."""
+    found = []
+    for name, current in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if current['rate'] < before['rate'] / (1 + tolerance):
+            found.append((name, 'rate', before['rate'], current['rate']))
+        if current['peak_kib'] > before['peak_kib'] * (1 + tolerance):
+            found.append((name, 'peak_kib', before['peak_kib'], current['peak_kib']))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths.")
+    parser.add_argument('--only', action='append', default=[], metavar='PREFIX',
+                        help="Only run cases whose name starts with PREFIX (repeatable)")
+    parser.add_argument('--quick', action='store_true', help="Fewer points on the scaling curves")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed repeats per case (best is kept)")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed slowdown or memory growth before flagging a regression (default 0.2)")
+    parser.add_argument('-o', '--out', default=None, help="Optional results CSV")
+    args = parser.parse_args(argv)
+
+    def progress(name, result):
+        print(f"{name:32} {result['seconds'] * 1000:10.2f} ms {result['rate']:14,.0f}/s "
+              f"{result['peak_kib']:10,.0f} KiB peak", flush=True)
+
+    results = run_benchmarks(args.only, args.quick, args.repeat, progress)
+    if args.out:
+        import pandas as pd
+        pd.DataFrame.from_dict(results, orient='index').rename_axis('case').to_csv(args.out)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    baseline = load_baseline(args.baseline)
+    if baseline['environment'] != environment():
+        print("Warning: the baseline was recorded in a different environment")
+    found = regressions(results, baseline, args.tolerance)
+    for name, what, before, now in found:
+        print(f"REGRESSION {name}: {what} {before:,.1f} -> {now:,.1f}")
+    if found:
+        sys.exit(1)
+    print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
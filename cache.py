@@ -0,0 +1,104 @@
+"""Memoization of finished simulations.
+
+Results are keyed on a canonical hash of everything that determines a
+seeded run: the compiled config (RunSpec.fingerprint), the player list,
+the seed and the simulation settings. ResultCache is a small, thread-safe
+LRU map so a server keeps a bounded number of games, and bytes, in memory.
+
+prefix_key is the same hash without the number of days. Runs that share
+it are identical up to the shorter run's last day, so a longer run can
+continue a copy of a cached shorter one instead of starting from day 1.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def simulation_key(spec, players_config, seed, settings):
+    """Canonical hash of a run's inputs.
+
+    players_config is the list of player dicts from player_input() and
+    settings the simulation_settings dict from user_input().
+    """
+    canonical = json.dumps({
+        'config': spec.fingerprint,
+        'players': players_config,
+        'seed': seed,
+        'settings': settings
+    }, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def prefix_key(spec, players_config, seed, settings):
+    """simulation_key of a run with the horizon (simulation_days) left out.
+
+    A memory budget is sized to the horizon, so budgeted runs keep it.
+    """
+    if not settings.get('memory_budget_mb'):
+        settings = {name: value for name, value in settings.items() if name != 'simulation_days'}
+    return simulation_key(spec, players_config, seed, settings)
+
+
+class ResultCache:
+    """Bounded LRU map from simulation key to finished Game.
+
+    Holds at most maxsize games and, with max_bytes, at most that many
+    bytes as measured by sizeof(game); a game bigger than max_bytes on its
+    own is not kept. Entries put with a prefix key can be found again by
+    longest_prefix().
+    """
+    def __init__(self, maxsize=8, max_bytes=None, sizeof=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._prefixes = {}  # key -> prefix key
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, game, prefix=None):
+        size = self.sizeof(game) if self.max_bytes is not None else 0
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._entries[key] = game
+            self._sizes[key] = size
+            self.nbytes += size
+            if prefix is not None:
+                self._prefixes[key] = prefix
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        if key in self._entries:
+            del self._entries[key]
+            self.nbytes -= self._sizes.pop(key)
+            self._prefixes.pop(key, None)
+
+    def longest_prefix(self, prefix, days):
+        """The cached game with this prefix key that got furthest without passing days."""
+        with self._lock:
+            best = None
+            for key, game_prefix in self._prefixes.items():
+                game = self._entries[key]
+                if game_prefix == prefix and game.days_completed <= days:
+                    if best is None or game.days_completed > best.days_completed:
+                        best = game
+            return best
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,160 @@
+"""Chart pipeline for simulation results.
+
+Series are downsampled with a min/max envelope per pixel bucket, every
+player is drawn into the same faceted figures (one panel per stat), and
+the rendered PNGs are cached on a digest of the data so reruns with
+unchanged results don't redraw anything.
+
+matplotlib and seaborn are imported on first render only.
+"""
+import hashlib
+import io
+from collections import OrderedDict
+
+import numpy as np
+
+MATERIALS = ['legendary', 'epic', 'rare', 'uncommon', 'common']
+TIERS = [1, 2, 3]
+
+# Width of one panel in pixels; each bucket keeps at most two points per pixel
+PANEL_WIDTH = 600
+CACHE_SIZE = 16
+
+_cache = OrderedDict()
+
+
+def downsample(x, y, buckets=PANEL_WIDTH):
+    """Keep the min and max point of each bucket, in x order.
+
+    The envelope looks the same as the full series at the given width but
+    never has more than 2 * buckets points.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(x)
+    if n <= 2 * buckets:
+        return x, y
+    bucket = np.arange(n) * buckets // n
+    # Within each bucket, sorted by value: first is the min, last the max
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(buckets))
+    ends = np.append(starts[1:], n) - 1
+    keep = np.unique(np.concatenate([order[starts], order[ends]]))
+    return x[keep], y[keep]
+
+
+def player_series(player):
+    """All plotted series of a player, keyed by panel title."""
+    series = {
+        "Gear Level (Sum of Gear Tiers)": player.gear_levels_over_time,
+        "Total Dungeon Completions": player.completions_over_time,
+    }
+    for tier in TIERS:
+        series[f"Win Rate (%) - Tier {tier}"] = player.win_rates_over_time[tier]
+    for material in MATERIALS:
+        series[f"{material.capitalize()} Materials"] = player.materials_over_time[material]
+    return series
+
+
+def results_digest(players):
+    """Digest of everything that ends up in the charts."""
+    digest = hashlib.blake2b(digest_size=16)
+    for player in players:
+        digest.update(player.name.encode())
+        digest.update(np.ascontiguousarray(player.turns).tobytes())
+        for values in player_series(player).values():
+            digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+def _render(players, titles, columns, figure_title):
+    # Figure is used directly rather than pyplot so nothing leaks between renders
+    from matplotlib.figure import Figure
+    import seaborn as sns
+
+    sns.set_theme(style="darkgrid")
+    rows = -(-len(titles) // columns)
+    fig = Figure(figsize=(6 * columns, 3.5 * rows), dpi=100)
+    axes = fig.subplots(rows, columns, squeeze=False).ravel()
+    for player in players:
+        series = player_series(player)
+        for ax, title in zip(axes, titles):
+            x, y = downsample(player.turns, series[title])
+            ax.plot(x, y, label=player.name, linewidth=1.2)
+    for ax, title in zip(axes, titles):
+        ax.set_title(title)
+        ax.set_xlabel("Turn")
+    for ax in axes[len(titles):]:
+        ax.set_visible(False)
+    axes[0].legend(loc='upper left', fontsize='small')
+    fig.suptitle(figure_title)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def render_charts(players):
+    """Return [(title, png_bytes)] for the progression and materials figures.
+
+    Results are cached on the data digest; at most CACHE_SIZE result sets
+    are kept.
+    """
+    key = results_digest(players)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    progression = ["Gear Level (Sum of Gear Tiers)", "Total Dungeon Completions"] + \
+        [f"Win Rate (%) - Tier {tier}" for tier in TIERS]
+    materials = [f"{material.capitalize()} Materials" for material in MATERIALS]
+    charts = [
+        ("Progression", _render(players, progression, 3, "Progression Over Time")),
+        ("Materials", _render(players, materials, 3, "Materials Over Time")),
+    ]
+    _cache[key] = charts
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return charts
+
+
+def render_tornado(rows, metric, top=15):
+    """Tornado chart (PNG) of sensitivity.tornado() rows: the metric at each parameter's low and high value."""
+    from matplotlib.figure import Figure
+    import seaborn as sns
+
+    sns.set_theme(style="darkgrid")
+    rows = rows.head(top).iloc[::-1]
+    base = rows['metric_base'].iloc[0] if len(rows) else 0
+    fig = Figure(figsize=(9, 0.35 * len(rows) + 1.5), dpi=100)
+    ax = fig.subplots()
+    positions = np.arange(len(rows))
+    ax.barh(positions, rows['metric_low'] - base, left=base, label="Parameter low", color='tab:blue')
+    ax.barh(positions, rows['metric_high'] - base, left=base, label="Parameter high", color='tab:orange')
+    ax.axvline(base, color='black', linewidth=1)
+    ax.set_yticks(positions, rows['parameter'], fontsize='small')
+    ax.set_xlabel(metric)
+    ax.legend(loc='lower right', fontsize='small')
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def render_heatmap(matrix):
+    """Heatmap (PNG) of a parameters x metrics elasticity matrix, centred on zero."""
+    from matplotlib.figure import Figure
+    import seaborn as sns
+
+    sns.set_theme(style="white")
+    fig = Figure(figsize=(1.6 * len(matrix.columns) + 4, 0.3 * len(matrix) + 2), dpi=100)
+    ax = fig.subplots()
+    limit = np.nanmax(np.abs(matrix.to_numpy(dtype=float))) if matrix.size else 0
+    sns.heatmap(matrix.astype(float), ax=ax, cmap='RdBu_r', center=0, vmin=-limit or None, vmax=limit or None,
+                annot=len(matrix) <= 30, fmt='.2f', annot_kws={'fontsize': 7}, cbar_kws={'label': 'Elasticity'})
+    ax.set_xlabel('')
+    ax.set_ylabel('')
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
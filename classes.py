@@ -1,80 +1,107 @@
 import random 
-import matplotlib.pyplot as plt
-import seaborn as sns
-import streamlit as st
+from array import array
+
+import events
+from config import RunSpec
+from events import RARITIES, RARITY_CODES, EventLog
+from recorder import TimeSeriesRecorder, sample_count, should_record
+import checkpoint
+from samplers import DropTable, TierChooser
+from scheduler import run_events
+from streams import PlayerStreams, new_seed
 
 class Contract:
     def __init__(self, config):
         self.config = config
         self.material_drop_chances = self.config.contract_material_drop_chances
+        # Default to 'rare' if no other rarity is selected
+        self.material_table = DropTable.compile(self.material_drop_chances, 'rare')
 
     def complete(self, player, game):
         """Complete a contract."""
         if player.pioneer_points < 3:
-            game.log_action(f"{player.name} does not have enough pioneer points to complete a contract")
+            game.log(events.NO_PIONEER_POINTS, player)
             return
         player.pioneer_points -= 3
         player.yoku += 1
-        game.log_action(f"{player.name} completed a contract and earned 1 yoku")
+        game.log(events.CONTRACT, player)
         # Roll for material
-        material_rarity = self.roll_material()
+        material_rarity = self.roll_material(player.rng.contract_material)
         player.materials[material_rarity] += 1
-        game.log_action(f"{player.name} received {material_rarity} material from the contract")
+        game.log(events.CONTRACT_MATERIAL, player, RARITY_CODES[material_rarity])
 
-    def roll_material(self):
+    def roll_material(self, rng=random):
         """Roll for material reward."""
-        result = random.random()
-        cumulative = 0.0
-        for rarity, chance in self.material_drop_chances.items():
-            cumulative += chance
-            if result < cumulative:
-                return rarity
-        # Default to 'rare' if no other rarity is selected
-        return 'rare'
+        return self.material_table.draw(rng.random())
 
 class Lootbox:
     def __init__(self, config):
         self.config = config
         self.loot_drop_chances = self.config.lootbox_loot_drop_chances
         self.pet_drop_chance = self.config.lootbox_pet_drop_chance
+        # Default to 'uncommon' if no other rarity is selected
+        self.loot_table = DropTable.compile(self.loot_drop_chances, 'uncommon')
+
+    def open_many(self, player, count, game):
+        """Open count lootboxes at once, with the rewards of count open() calls.
+
+        The loot and pet rolls are drawn as one batch per stream. When the
+        log doesn't keep per-item events the gear is equipped in a single
+        pass, otherwise item by item so every event is logged in order.
+        """
+        loot_rolls = player.rng.lootbox_loot.take(count)
+        pets = (player.rng.lootbox_pet.take(count) < self.pet_drop_chance).tolist()
+        if game.log_level < events.SUMMARY and player.can_equip_counts():
+            player.equip_counts(self.loot_table.draw_counts(loot_rolls))
+            player.pets.extend(['Lootbox Pet'] * sum(pets))
+            return
+        for loot_rarity, pet in zip(self.loot_table.draw_many(loot_rolls), pets):
+            game.log(events.LOOTBOX, player)
+            player.add_gear(loot_rarity, game)
+            if pet:
+                player.pets.append('Lootbox Pet')
+                game.log(events.LOOTBOX_PET, player)
 
     def open(self, player, game):
         """Open the lootbox and grant rewards to the player."""
         # Roll for loot
-        loot_rarity = self.roll_loot()
+        loot_rarity = self.roll_loot(player.rng.lootbox_loot)
         player.add_gear(loot_rarity, game)
         # Roll for pet
-        pet_received = self.roll_pet()
+        pet_received = self.roll_pet(player.rng.lootbox_pet)
         if pet_received:
             player.pets.append(pet_received)
-            game.log_action(f"{player.name} received a pet from the lootbox: {pet_received}")
+            game.log(events.LOOTBOX_PET, player)
 
-    def roll_loot(self):
+    def roll_loot(self, rng=random):
         """Roll to determine loot received from a lootbox."""
-        result = random.random()
-        cumulative = 0.0
-        for rarity, chance in self.loot_drop_chances.items():
-            cumulative += chance
-            if result < cumulative:
-                return rarity
-        # Default to 'uncommon' if no other rarity is selected
-        return 'uncommon'
+        return self.loot_table.draw(rng.random())
 
-    def roll_pet(self):
+    def roll_pet(self, rng=random):
         """Roll to determine if a pet is received from a lootbox."""
-        result = random.random()
+        result = rng.random()
         if result < self.pet_drop_chance:
             return 'Lootbox Pet'
         else:
             return None
 class Player:
-    def __init__(self, name, config, activity_level=1.0, play_frequency=1):
+    __slots__ = ('name', 'config', 'activity_level', 'play_frequency', 'last_play_day', 'rounds_played',
+                 'index', 'stream_id', 'rng', 'yoku', 'pioneer_points', 'skull_tokens', 'materials',
+                 'gear_counts', 'gear_count', 'gear_bonus', 'lowest_gear', 'pets', 'dungeon_attempts',
+                 'dungeon_completions', 'gear_level', 'total_completions', 'lootboxes_opened', 'recorder')
+
+    def __init__(self, name, config, activity_level=1.0, play_frequency=1, stream_id=None):
         self.name = name
         self.config = config
         self.activity_level = activity_level  # % of rounds played (0.0 to 1.0)
         self.play_frequency = play_frequency  # Days between play sessions
         self.last_play_day = 0  # Track the last day played
         self.rounds_played = 0  # Track number of rounds played
+        self.index = None  # Position in the game's player list, set by Game
+        # Id the player's random streams are derived from; defaults to index.
+        # Keeping it when a player is run on their own reproduces their results.
+        self.stream_id = stream_id
+        self.rng = None  # PlayerStreams, set by Game
         
         # Initialize resources
         self.yoku = 3
@@ -88,25 +115,47 @@ class Player:
             'uncommon': 0,
             'common': 0
         }
-        # Gear inventory, max 5 items
-        self.gear = []  # List to hold gear items
+        # Gear inventory, max 5 items, as a count per rarity (RARITIES order)
+        self.gear_counts = array('B', bytes(len(RARITIES)))
+        self.gear_count = 0
+        self.gear_bonus = 0.0  # Sum of equipped gear bonus values
+        self.lowest_gear = None  # Rarity of the lowest-tier equipped item
         self.pets = []
         # Dungeon stats
         self.dungeon_attempts = {1: 0, 2: 0, 3: 0}
         self.dungeon_completions = {1: 0, 2: 0, 3: 0}
-        # Data over time
-        self.turns = []
-        self.gear_levels_over_time = []
-        # Also update the materials_over_time tracking
-        self.materials_over_time = {
-            'legendary': [],
-            'epic': [],
-            'rare': [],
-            'uncommon': [],
-            'common': []
-        }
-        self.completions_over_time = []
-        self.win_rates_over_time = {1: [], 2: [], 3: []}
+        # Running totals, kept up to date as gear and completions change
+        self.gear_level = 0  # Sum of equipped gear tier values
+        self.total_completions = 0
+        self.lootboxes_opened = 0
+        # Data over time, preallocated by Game.run
+        self.recorder = TimeSeriesRecorder()
+
+    @property
+    def gear(self):
+        """Equipped items as a list of rarities, highest tier first."""
+        return [rarity for rarity in reversed(RARITIES) for _ in range(self.gear_counts[RARITY_CODES[rarity]])]
+
+    @property
+    def turns(self):
+        return self.recorder.column('turns')
+
+    @property
+    def gear_levels_over_time(self):
+        return self.recorder.column('gear_levels')
+
+    @property
+    def materials_over_time(self):
+        return {material: self.recorder.material_series(material)
+                for material in ['legendary', 'epic', 'rare', 'uncommon', 'common']}
+
+    @property
+    def completions_over_time(self):
+        return self.recorder.column('completions')
+
+    @property
+    def win_rates_over_time(self):
+        return {tier: self.recorder.win_rate_series(tier) for tier in [1, 2, 3]}
 
     def reset_daily_resources(self):
         """Reset daily resources - no longer used."""
@@ -116,12 +165,12 @@ class Player:
         """Add resources every 6 rounds."""
         self.yoku += 1
         self.pioneer_points += 2
-        game.log_action(f"{self.name} received 1 yoku and 2 pioneer points")
+        game.log(events.PERIODIC_RESOURCES, self)
 
     def attempt_dungeon(self, dungeon, game):
         """Attempt a dungeon run."""
         if self.yoku < 1:
-            game.log_action(f"{self.name} does not have enough yoku to enter the dungeon")
+            game.log(events.NO_YOKU, self)
             return
         self.yoku -= 1  # Spend 1 yoku to enter dungeon
         self.dungeon_attempts[dungeon.tier] += 1  # Increment attempts
@@ -129,98 +178,142 @@ class Player:
         success = dungeon.attempt(self, game)
         if success:
             self.dungeon_completions[dungeon.tier] += 1  # Increment completions
+            self.total_completions += 1
 
-            game.log_action(f"{self.name} successfully completed Tier {dungeon.tier} dungeon!")
+            game.log(events.DUNGEON_WIN, self, dungeon.tier)
             # Loot roll
-            loot_rarity = dungeon.roll_loot()
+            loot_rarity = dungeon.roll_loot(self.rng.loot)
             self.add_gear(loot_rarity, game)
             # Material roll
-            material_rarity = dungeon.roll_material()
+            material_rarity = dungeon.roll_material(self.rng.material)
             self.materials[material_rarity] += 1
-            game.log_action(f"{self.name} received {material_rarity} material")
+            game.log(events.DUNGEON_MATERIAL, self, RARITY_CODES[material_rarity])
             # Pet roll
-            pet_received = dungeon.roll_pet()
+            pet_received = dungeon.roll_pet(self.rng.pet)
             if pet_received:
                 self.pets.append(pet_received)
-                game.log_action(f"{self.name} received a pet: {pet_received}")
+                game.log(events.DUNGEON_PET, self, dungeon.tier)
             # Guaranteed currency for completing dungeon
             self.skull_tokens += 1
             self.pioneer_points += 1
-            game.log_action(f"{self.name} received a skull token and a pioneer credit")
+            game.log(events.DUNGEON_REWARD, self)
         else:
-            game.log_action(f"{self.name} failed to complete Tier {dungeon.tier} dungeon")
+            game.log(events.DUNGEON_FAIL, self, dungeon.tier)
 
     def complete_contract(self, game):
         """Complete a contract using pioneer points."""
-        contract = Contract(self.config)
-        contract.complete(self, game)
+        game.contract.complete(self, game)
 
     def purchase_lootbox(self, game):
         """Purchase a pity lootbox."""
         if self.skull_tokens < 5 or self.materials['epic'] < 5 or self.materials['rare'] < 5:
-            game.log_action(f"{self.name} does not have enough resources to purchase a lootbox")
+            game.log(events.NO_LOOTBOX, self)
             return
         
         self.skull_tokens -= 5
         self.materials['rare'] -= 5
         self.materials['epic'] -= 5
-        game.log_action(f"{self.name} purchased a lootbox")
+        self.lootboxes_opened += 1
+        game.log(events.LOOTBOX, self)
         
         # Open the lootbox
-        lootbox = Lootbox(self.config)
-        lootbox.open(self, game)
+        game.lootbox.open(self, game)
+
+    def purchase_lootboxes(self, game):
+        """Buy and open as many lootboxes as the player can afford.
+
+        The same as calling purchase_lootbox while it succeeds, but a burst
+        of several is paid for and opened in one batch.
+        """
+        count = min(self.skull_tokens, self.materials['epic'], self.materials['rare']) // 5
+        if count == 1:
+            self.purchase_lootbox(game)
+        elif count > 1:
+            self.skull_tokens -= 5 * count
+            self.materials['rare'] -= 5 * count
+            self.materials['epic'] -= 5 * count
+            self.lootboxes_opened += count
+            game.lootbox.open_many(self, count, game)
 
     def add_gear(self, gear_rarity, game):
         """Add gear to inventory, replacing lowest tier if full."""
         gear_tier_values = self.config.gear_tier_values
-        print(f"{self.name} received {gear_rarity} gear.")
-        if len(self.gear) < 5:
+        code = RARITY_CODES[gear_rarity]
+        game.log(events.GEAR_RECEIVED, self, code)
+        if self.gear_count < 5:
             # Add the new gear
-            self.gear.append(gear_rarity)
-            print(f"{self.name} equipped {gear_rarity} gear.")
-            game.log_action(f"{self.name} equipped {gear_rarity} gear")
+            self.gear_counts[code] += 1
+            self.gear_count += 1
+            self.gear_level += gear_tier_values.get(gear_rarity, 0)
+            if self.lowest_gear is None or gear_tier_values[gear_rarity] < gear_tier_values[self.lowest_gear]:
+                self.lowest_gear = gear_rarity
+            self.gear_bonus = self.sum_gear_bonus()
+            game.log(events.GEAR_EQUIPPED, self, code)
         else:
-            # Find the lowest-tier gear
-            lowest_tier_gear = min(self.gear, key=lambda x: gear_tier_values[x])
+            lowest_tier_gear = self.lowest_gear
             if gear_tier_values[gear_rarity] > gear_tier_values[lowest_tier_gear]:
                 # Replace the lowest-tier gear
-                self.gear.remove(lowest_tier_gear)
-                self.gear.append(gear_rarity)
-                print(f"{self.name} replaced {lowest_tier_gear} gear with {gear_rarity} gear.")
-                game.log_action(f"{self.name} replaced {lowest_tier_gear} gear with {gear_rarity} gear")
+                self.gear_counts[RARITY_CODES[lowest_tier_gear]] -= 1
+                self.gear_counts[code] += 1
+                self.gear_level += gear_tier_values[gear_rarity] - gear_tier_values[lowest_tier_gear]
+                if not self.gear_counts[RARITY_CODES[lowest_tier_gear]]:
+                    self.lowest_gear = self.find_lowest_gear()
+                self.gear_bonus = self.sum_gear_bonus()
+                game.log(events.GEAR_REPLACED, self, RARITY_CODES[lowest_tier_gear], code)
             else:
-                print(f"{self.name}'s gear slots are full. {gear_rarity} gear was discarded.")
-                game.log_action(f"{self.name}'s gear slots are full. {gear_rarity} gear was discarded")
+                game.log(events.GEAR_DISCARDED, self, code)
 
-    def calculate_gear_bonus(self):
-        """Calculate gear bonus based on equipped gear."""
+    def can_equip_counts(self):
+        """Whether equip_counts gives the same gear as add_gear: every rarity has its own tier value."""
+        tiers = [self.config.gear_tier_values.get(rarity, 0) for rarity in RARITIES]
+        return len(set(tiers)) == len(tiers)
+
+    def equip_counts(self, counts):
+        """Equip a batch of items (rarity -> count) in one pass, without logging.
+
+        Adding items one by one keeps the five highest-tier items seen, so
+        the batch keeps the five highest of the equipped and new items.
+        """
+        gear_tier_values = self.config.gear_tier_values
+        free = 5
+        for rarity in sorted(RARITIES, key=lambda rarity: gear_tier_values.get(rarity, 0), reverse=True):
+            code = RARITY_CODES[rarity]
+            kept = min(self.gear_counts[code] + counts.get(rarity, 0), free)
+            self.gear_counts[code] = kept
+            free -= kept
+        self.gear_count = 5 - free
+        self.update_gear_totals()
+
+    def sum_gear_bonus(self):
+        """Gear bonus of the equipped items, summed in RARITIES order."""
         gear_bonus_values = self.config.gear_bonus_values
         total_bonus = 0.0
-        for gear_rarity in self.gear:
-            bonus_per_gear = gear_bonus_values.get(gear_rarity, 0)
-            total_bonus += bonus_per_gear
+        for rarity, count in zip(RARITIES, self.gear_counts):
+            total_bonus += count * gear_bonus_values.get(rarity, 0)
         return total_bonus
 
+    def find_lowest_gear(self):
+        """Rarity of the lowest-tier equipped item (ties go to the lower rarity)."""
+        gear_tier_values = self.config.gear_tier_values
+        equipped = [rarity for rarity, count in zip(RARITIES, self.gear_counts) if count]
+        return min(equipped, key=lambda rarity: gear_tier_values[rarity]) if equipped else None
+
+    def update_gear_totals(self):
+        """Recompute gear level, bonus and lowest item, e.g. after the config changed."""
+        gear_tier_values = self.config.gear_tier_values
+        self.gear_level = sum(count * gear_tier_values.get(rarity, 0)
+                              for rarity, count in zip(RARITIES, self.gear_counts))
+        self.gear_bonus = self.sum_gear_bonus()
+        self.lowest_gear = self.find_lowest_gear()
+
+    def calculate_gear_bonus(self):
+        """Calculate gear bonus based on equipped gear."""
+        return self.gear_bonus
+
     def record_stats(self, turn_number):
         """Record stats for plotting."""
-        # Record the turn number
-        self.turns.append(turn_number)
-        # Record gear level (sum of gear tier values)
-        gear_tier_values = self.config.gear_tier_values
-        gear_level = sum([gear_tier_values[gear] for gear in self.gear])
-        self.gear_levels_over_time.append(gear_level)
-        # Record materials - Updated to include all rarities
-        for material in ['legendary', 'epic', 'rare', 'uncommon', 'common']:
-            self.materials_over_time[material].append(self.materials[material])
-        # Record total dungeon completions
-        total_completions = sum(self.dungeon_completions.values())
-        self.completions_over_time.append(total_completions)
-        # Record win rates per tier
-        for tier in [1, 2, 3]:
-            attempts = self.dungeon_attempts[tier]
-            completions = self.dungeon_completions[tier]
-            win_rate = (completions / attempts * 100) if attempts > 0 else 0
-            self.win_rates_over_time[tier].append(win_rate)
+        self.recorder.record(turn_number, self.gear_level, self.materials, self.total_completions,
+                             self.dungeon_attempts, self.dungeon_completions)
 
     def should_play_today(self, current_day):
         """Determine if the player should play on the current day"""
@@ -260,76 +353,110 @@ class Dungeon:
         self.loot_drop_chances = self.config.dungeon_loot_drop_chances[tier]
         self.material_drop_chances = self.config.dungeon_material_drop_chances[tier]
         self.pet_drop_chances = self.config.dungeon_pet_drop_chances
+        self.loot_table = DropTable.compile(self.loot_drop_chances, 'uncommon')
+        self.material_table = DropTable.compile(self.material_drop_chances, 'rare')
 
     def attempt(self, player, game):
         """Check if player wins, factoring in gear bonus."""
         base_win_chance = self.win_probabilities[self.tier]
         gear_bonus = player.calculate_gear_bonus()
         total_win_chance = base_win_chance + gear_bonus
-        result = random.random()
+        result = player.rng.win.random()
         success = result < total_win_chance
-        game.log_action(
-            f"{player.name}'s chance to win was {total_win_chance * 100:.2f}% "
-            f"(Base: {base_win_chance * 100:.2f}%, Gear Bonus: {gear_bonus * 100:.2f}%)"
-        )
+        if game.log_level >= events.DEBUG:
+            game.log(events.WIN_CHANCE, player,
+                     events.pct(total_win_chance), events.pct(base_win_chance), events.pct(gear_bonus))
         return success
 
-    def roll_loot(self):
+    def roll_loot(self, rng=random):
         """Roll to determine the loot rarity received."""
-        result = random.random()
-        cumulative = 0.0
-        for rarity, chance in self.loot_drop_chances.items():
-            cumulative += chance
-            if result < cumulative:
-                return rarity
-        return 'uncommon'  # Default to 'uncommon'
-
-    def roll_material(self):
+        return self.loot_table.draw(rng.random())
+
+    def roll_material(self, rng=random):
         """Roll to determine the material rarity received."""
-        result = random.random()
-        cumulative = 0.0
-        for rarity, chance in self.material_drop_chances.items():
-            cumulative += chance
-            if result < cumulative:
-                return rarity
-        return 'rare'  # Default to 'rare'
-
-    def roll_pet(self):
+        return self.material_table.draw(rng.random())
+
+    def roll_pet(self, rng=random):
         """Roll to determine if a pet is received."""
         chance = self.pet_drop_chances[self.tier]
-        result = random.random()
+        result = rng.random()
         if result < chance:
             return f"Pet Tier {self.tier}"
         else:
             return None
 class Game:
-    def __init__(self, players, config, rounds_per_day=10):
+    def __init__(self, players, config, rounds_per_day=10, seed=None, log_level=events.ACTIONS,
+                 record_every=1, antithetic=False, event_driven=True, action_log=None):
         self.players = players
-        self.config = config
+        for i, player in enumerate(players):
+            player.index = i
+        self.set_config(config)
+        # Antithetic games draw 1 - u wherever the regular game with this seed draws u
+        self.antithetic = antithetic
+        self.reseed(new_seed() if seed is None else seed)
         self.current_day = 1
         self.current_round = 1
         self.rounds_per_day = rounds_per_day
         self.total_turns = 0  # To track the number of turns
-        self.action_log = []  # Add this line
+        # Record stats every N rounds, or 'day' for once at the end of each day
+        self.record_every = record_every
+        # Events are stored as records and only rendered when read
+        self.log_level = log_level
+        # Jump between player turns instead of visiting every player every round (see scheduler.py)
+        self.event_driven = event_driven
+        # A prebuilt log (e.g. an events.BoundedEventLog under a memory budget) replaces the default
+        self.action_log = EventLog([player.name for player in players], log_level) if action_log is None else action_log
+
+    def set_config(self, config):
+        """Switch the game's rules; takes effect from the next roll."""
+        # Freeze the settings once; players and prebuilt objects share the snapshot
+        self.config = config if isinstance(config, RunSpec) else config.compile()
+        for player in self.players:
+            player.config = self.config
+            player.update_gear_totals()
+        self.dungeons = {tier: Dungeon(tier, self.config) for tier in self.config.dungeon_win_probabilities}
+        self.contract = Contract(self.config)
+        self.lootbox = Lootbox(self.config)
+        self.tier_chooser = TierChooser(self.config.dungeon_choice_probabilities)
+
+    def reseed(self, seed):
+        """Give every player fresh streams per roll type, derived from seed."""
+        self.seed = seed
+        for player in self.players:
+            player.rng = PlayerStreams(seed, player.index if player.stream_id is None else player.stream_id,
+                                       self.antithetic)
+
+    @property
+    def days_completed(self):
+        """Number of days played to the end."""
+        return self.total_turns // self.rounds_per_day
+
+    def log(self, event, player=None, a=0, b=0, c=0):
+        """Record an event if the log's verbosity includes it."""
+        if event.level <= self.log_level:
+            self.action_log.append(event, self.current_day, self.current_round,
+                                   -1 if player is None else player.index, a, b, c)
 
     def log_action(self, message):
-        """Add a message to the action log."""
-        self.action_log.append(f"[Day {self.current_day}, Round {self.current_round}] {message}")
+        """Add a free-text message to the action log."""
+        if events.TEXT.level <= self.log_level:
+            self.action_log.append_text(self.current_day, self.current_round, message)
 
     def start_day(self):
         """Initialize resources at the start of each day."""
-        self.log_action(f"Starting Day {self.current_day}")
+        self.log(events.START_DAY, None, self.current_day)
         self.current_round = 1
 
     def play_round(self):
         """Execute a single round."""
-        self.log_action(f"Starting Round {self.current_round}")
+        self.log(events.START_ROUND, None, self.current_round)
         
         # Add periodic resources every 6 rounds
         if self.total_turns > 0 and self.total_turns % 6 == 0:
             for player in self.players:
                 player.add_periodic_resources(self)
         
+        record = should_record(self.total_turns, self.rounds_per_day, self.record_every)
         for player in self.players:
             plays_today = player.should_play_today(self.current_day)
             
@@ -337,11 +464,12 @@ class Game:
                 if player.should_play_round():
                     self.play_turn(player)
                 else:
-                    print(f"{player.name} skipping round due to activity level")
+                    self.log(events.SKIP_ROUND, player)
             else:
-                print(f"{player.name} not playing on day {self.current_day}")
+                self.log(events.NOT_PLAYING, player, self.current_day)
             
-            player.record_stats(self.total_turns)
+            if record:
+                player.record_stats(self.total_turns)
         
         self.current_round += 1
         self.total_turns += 1
@@ -358,67 +486,49 @@ class Game:
             choices.append('contract') 
 
         if not choices:
-            print(f"{player.name} has no actions to take this turn.")
+            self.log(events.NO_ACTIONS, player)
             return
         
-        action = random.choice(choices)
+        action = choices[int(player.rng.action.random() * len(choices))]
         if action == 'dungeon':
             # Determine dungeon tier based on gear level and probabilities
             gear_level = player.calculate_gear_bonus()
-            tier_choice = self.choose_dungeon_tier(gear_level)
-            dungeon = Dungeon(tier_choice, self.config)
-            player.attempt_dungeon(dungeon, self)
+            tier_choice = self.choose_dungeon_tier(gear_level, player.rng.tier)
+            player.attempt_dungeon(self.dungeons[tier_choice], self)
         elif action == 'contract':
             player.complete_contract(self)
         
         # Attempt to purchase lootboxes after the main action
-        while (player.skull_tokens >= 5 and player.materials['epic'] >= 5 and player.materials['rare'] >= 5):
-            player.purchase_lootbox(self)
+        player.purchase_lootboxes(self)
 
-    def choose_dungeon_tier(self, gear_level):
+    def choose_dungeon_tier(self, gear_level, rng=random):
         """Choose a dungeon tier based on gear level and defined probabilities."""
-        gear_modifier_tier_1 = self.config.dungeon_choice_probabilities['tier_1']['gear_modifier']
-        gear_modifier_tier_2 = self.config.dungeon_choice_probabilities['tier_2']['gear_modifier']
-        gear_modifier_tier_3 = self.config.dungeon_choice_probabilities['tier_3']['gear_modifier']
-        # Define base probabilities for each tier
-        base_probabilities = {
-            1: 10,  # High probability for Tier 1
-            2: 5,  # Lower probability for Tier 2
-            3: 1   # Lowest probability for Tier 3
-        }
-
-        # Scale probabilities based on gear level
         # The higher the gear level, the more likely to choose higher tiers
-        probabilities = {
-            1: base_probabilities[1],  # Increase for Tier 1
-            2: base_probabilities[2] + (gear_modifier_tier_2* gear_level),  # Increase for Tier 2
-            3: base_probabilities[3] + (gear_modifier_tier_3 * gear_level)   # Increase for Tier 3
-        }
-
-        # Normalize probabilities
-        total_probability = sum(probabilities.values())
-        if total_probability == 0:
-            return 1  # Default to Tier 1 if no valid probabilities
-
-        # Normalize the probabilities
-        probabilities = {tier: prob / total_probability for tier, prob in probabilities.items()}
-
-        # Choose a tier based on the calculated probabilities
-        random_choice = random.uniform(0, 1)
-        cumulative_probability = 0.0
-        for tier, prob in probabilities.items():
-            cumulative_probability += prob
-            if random_choice < cumulative_probability:
-                return tier
-
-        return 1  # Default to Tier 1 if something goes wrong
-
-    def run(self, days=1):
-        """Run the game for a specified number of days."""
-        self.start_day()
-        total_rounds = days * self.rounds_per_day
+        return self.tier_chooser.choose(gear_level, rng.random())
+
+    def run(self, days=1, checkpoint_every=None, checkpoint_path=None):
+        """Run the game for a specified number of days.
+
+        With checkpoint_every, a checkpoint is written to checkpoint_path
+        after every that many days; a game loaded from it continues from
+        where it stopped when run() is called again.
+        """
+        # A game that was already started (or resumed from a checkpoint) carries on where it stopped
+        if self.total_turns == 0:
+            self.start_day()
+        # Reserve recorder space for the rest of the run up front
+        last_turn = days * self.rounds_per_day - 1
+        samples = sample_count(self.total_turns, last_turn, self.rounds_per_day, self.record_every)
+        for player in self.players:
+            player.recorder.reserve(samples)
+        # DEBUG logs report every idle round, so only the round loop can write them
+        if self.event_driven and self.log_level < events.DEBUG and self.current_round == 1:
+            run_events(self, days, checkpoint_every, checkpoint_path)
+            return
         while self.current_day <= days and self.current_round <= self.rounds_per_day:
             self.play_round()
+            if checkpoint_every and self.current_round == 1 and (self.current_day - 1) % checkpoint_every == 0:
+                checkpoint.save(self, checkpoint_path)
 
     def display_stats(self):
         """Display the stats for each player at the end of the game."""
@@ -442,54 +552,14 @@ class Game:
             print(f"Overall Dungeon Completion Rate: {overall_completion_rate:.2f}%")
             
     def plot_stats(self):
-        """Plot the stats collected over time using matplotlib and seaborn."""
-        sns.set_theme(style="darkgrid")
-        for player in self.players:
-            # Split columns for side-by-side display
-            col1, col2 = st.columns(2)
-
-            # Plot Gear Level Over Time
-            with col1:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                ax.plot(player.turns, player.gear_levels_over_time, marker='o')
-                ax.set_title(f"{player.name} - Gear Level Over Time")
-                ax.set_xlabel("Turn")
-                ax.set_ylabel("Gear Level (Sum of Gear Tiers)")
-                st.pyplot(fig)
-                plt.clf()
-
-            # Plot Materials Over Time
-            with col2:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                for material in ['legendary', 'epic', 'rare', 'uncommon', 'common']:
-                    ax.plot(player.turns, player.materials_over_time[material], label=material.capitalize())
-                ax.set_title(f"{player.name} - Materials Over Time")
-                ax.set_xlabel("Turn")
-                ax.set_ylabel("Quantity")
-                ax.legend()
-                st.pyplot(fig)
-                plt.clf()
-
-            # Plot Dungeon Completions Over Time
-            with col2:
-                fig, ax = plt.subplots(figsize=(10, 6))
-                ax.plot(player.turns, player.completions_over_time, marker='o')
-                ax.set_title(f"{player.name} - Total Dungeon Completions Over Time")
-                ax.set_xlabel("Turn")
-                ax.set_ylabel("Total Completions")
-                st.pyplot(fig)
-                plt.clf()
-
-            # Plot Win Rates Per Tier Over Time
-            for tier in [1, 2, 3]:
-                with col1:
-                    fig, ax = plt.subplots(figsize=(10, 6))
-                    ax.plot(player.turns, player.win_rates_over_time[tier], marker='o')
-                    ax.set_title(f"{player.name} - Win Rate Over Time for Tier {tier}")
-                    ax.set_xlabel("Turn")
-                    ax.set_ylabel("Win Rate (%)")
-                    st.pyplot(fig)
-                    plt.clf()
+        """Show the stats collected over time as the cached chart images from charts.py."""
+        # UI libraries are imported here so headless runs never pay for them
+        import streamlit as st
+        from charts import render_charts
+
+        # All players share one faceted figure per stat group; renders are cached
+        for title, png in render_charts(self.players):
+            st.image(png, caption=title, use_column_width=True)
 
 class PlayableGame(Game):
     """Extension of Game class for interactive play"""
@@ -498,10 +568,10 @@ class PlayableGame(Game):
             super().__init__(player, config)
         else:
             super().__init__([player], config)
-        self.action_log = []
     
     def display_status(self):
         """Display current game status"""
+        import streamlit as st
         st.subheader("Game Status")
         st.write(f"Day: {self.current_day}, Round: {self.current_round}")
         
@@ -512,6 +582,7 @@ class PlayableGame(Game):
     
     def display_player_status(self, player):
         """Display current status for a specific player"""
+        import streamlit as st
         st.write(f"Yoku: {player.yoku}")
         st.write(f"Pioneer Points: {player.pioneer_points}")
         st.write(f"Skull Tokens: {player.skull_tokens}")
@@ -533,10 +604,12 @@ class PlayableGame(Game):
     
     def display_round_info(self):
         """Display current round information"""
+        import streamlit as st
         st.header(f"Day {self.current_day} - Round {self.current_round}")
     
     def display_player_actions(self, player):
         """Display available actions for a specific player"""
+        import streamlit as st
         # Ensure players_acted exists in session state
         if 'play_state' not in st.session_state:
             st.session_state.play_state = {
@@ -553,15 +626,13 @@ class PlayableGame(Game):
         # Dungeon action
         tier = st.selectbox(f"Dungeon Tier", [1, 2, 3], key=f"dungeon_tier_{player.name}")
         if st.button("Enter Dungeon", disabled=player.yoku < 1, key=f"dungeon_{player.name}"):
-            dungeon = Dungeon(tier, self.config)
-            player.attempt_dungeon(dungeon, self)
+            player.attempt_dungeon(self.dungeons[tier], self)
             st.session_state.play_state['players_acted'].add(player.name)
             st.rerun()
         
         # Contract action
         if st.button("Complete Contract", disabled=player.pioneer_points < 3, key=f"contract_{player.name}"):
-            contract = Contract(self.config)
-            contract.complete(player, self)
+            self.contract.complete(player, self)
             st.session_state.play_state['players_acted'].add(player.name)
             st.rerun()
         
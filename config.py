@@ -1,3 +1,11 @@
+import hashlib
+import json
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+from samplers import DropTable
+
+
 class Config:
     """Configuration class to hold all adjustable parameters."""
     def __init__(self):
@@ -58,15 +66,15 @@ class Config:
         # Dungeon tier choice probabilities based on gear level thresholds
         self.dungeon_choice_probabilities = {
             'tier_1': {
-    
+                'gear_modifier': 0.0,
                 'probability': 10  # Base probability of choosing Tier 1
             },
             'tier_2': {
-  
+                'gear_modifier': 0.5,
                 'probability': 5  # Base probability of choosing Tier 2
             },
             'tier_3': {
-     
+                'gear_modifier': 1.0,
                 'probability': 1  # Base probability of choosing Tier 3
             }
         }
@@ -74,4 +82,150 @@ class Config:
     def update_dungeon_choice_probabilities(self, tier, threshold, probability):
         """Update the dungeon choice probabilities for a specific tier."""
         if tier in self.dungeon_choice_probabilities:
-            self.dungeon_choice_probabilities[tier]['probability'] = probability
\ No newline at end of file
+            self.dungeon_choice_probabilities[tier]['probability'] = probability
+
+    def update_from_user_input(self, user_config):
+        """Apply a settings dict shaped like the output of app.user_input().
+
+        Keys that are missing keep their default values, also inside a
+        table: {"gear_bonus_values": {"legendary": 0.07}} only changes the
+        legendary bonus, and {"dungeon_loot_drop_chances": {"1": {"legendary":
+        0.5}}} only the tier 1 legendary chance. Tier keys may be strings (as
+        they are after a JSON round trip) or integers.
+        """
+        for key in ['contract_material_drop_chances', 'lootbox_loot_drop_chances', 'gear_bonus_values']:
+            if key in user_config:
+                setattr(self, key, {**getattr(self, key), **user_config[key]})
+        if 'lootbox_pet_drop_chance' in user_config:
+            self.lootbox_pet_drop_chance = user_config['lootbox_pet_drop_chance']
+        for key in ['dungeon_win_probabilities', 'dungeon_loot_drop_chances',
+                    'dungeon_material_drop_chances', 'dungeon_pet_drop_chances']:
+            if key in user_config:
+                table = dict(getattr(self, key))
+                for tier, value in user_config[key].items():
+                    tier = int(tier)
+                    # Per-tier drop tables merge too, so {"1": {"legendary": 0.5}} keeps the other rarities
+                    if isinstance(value, Mapping) and isinstance(table.get(tier), Mapping):
+                        value = {**table[tier], **value}
+                    table[tier] = value
+                setattr(self, key, table)
+        for tier, choice in user_config.get('dungeon_choice', {}).items():
+            if tier in self.dungeon_choice_probabilities:
+                for field in ['probability', 'gear_modifier']:
+                    if field in choice:
+                        self.dungeon_choice_probabilities[tier][field] = choice[field]
+
+    def compile(self):
+        """Validate the current settings and freeze them into a RunSpec."""
+        return RunSpec(
+            contract_material_drop_chances=_drop_table(
+                'contract_material_drop_chances', self.contract_material_drop_chances, 'rare'),
+            lootbox_loot_drop_chances=_drop_table(
+                'lootbox_loot_drop_chances', self.lootbox_loot_drop_chances, 'uncommon'),
+            lootbox_pet_drop_chance=_chance('lootbox_pet_drop_chance', self.lootbox_pet_drop_chance),
+            gear_bonus_values=FrozenMap(self.gear_bonus_values),
+            gear_tier_values=FrozenMap(self.gear_tier_values),
+            dungeon_win_probabilities=FrozenMap({
+                tier: _chance(f"dungeon_win_probabilities[{tier}]", chance)
+                for tier, chance in self.dungeon_win_probabilities.items()
+            }),
+            dungeon_loot_drop_chances=FrozenMap({
+                tier: _drop_table(f"dungeon_loot_drop_chances[{tier}]", chances, 'uncommon')
+                for tier, chances in self.dungeon_loot_drop_chances.items()
+            }),
+            dungeon_material_drop_chances=FrozenMap({
+                tier: _drop_table(f"dungeon_material_drop_chances[{tier}]", chances, 'rare')
+                for tier, chances in self.dungeon_material_drop_chances.items()
+            }),
+            dungeon_pet_drop_chances=FrozenMap({
+                tier: _chance(f"dungeon_pet_drop_chances[{tier}]", chance)
+                for tier, chance in self.dungeon_pet_drop_chances.items()
+            }),
+            dungeon_choice_probabilities=FrozenMap({
+                tier: FrozenMap(choice) for tier, choice in self.dungeon_choice_probabilities.items()
+            })
+        )
+
+
+class FrozenMap(Mapping):
+    """Read-only, hashable dict used for the tables of a RunSpec."""
+    def __init__(self, values):
+        self._values = dict(values)
+        self._hash = None
+
+    def __getitem__(self, key):
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(self._values.items()))
+        return self._hash
+
+    def __repr__(self):
+        return f"FrozenMap({self._values!r})"
+
+    def __getstate__(self):
+        # String hashes differ between processes, so the cached hash isn't kept
+        return {'_values': self._values, '_hash': None}
+
+
+def _chance(name, chance):
+    if not 0.0 <= chance <= 1.0:
+        raise ValueError(f"{name} must be between 0 and 1, got {chance}")
+    return float(chance)
+
+
+def _drop_table(name, chances, default):
+    """Check a chance dict and compile it, normalized to sum to 1.0."""
+    if any(chance < 0 for chance in chances.values()):
+        raise ValueError(f"{name} has a negative drop chance: {chances}")
+    total = sum(chances.values())
+    if total <= 0:
+        raise ValueError(f"{name} drop chances sum to zero")
+    return DropTable.compile({rarity: chance / total for rarity, chance in chances.items()}, default)
+
+
+def _plain(value):
+    """Convert RunSpec tables back to JSON-friendly dicts."""
+    if isinstance(value, Mapping):
+        return {str(key): _plain(item) for key, item in value.items()}
+    return value
+
+
+@dataclass(frozen=True)
+class RunSpec:
+    """Immutable, validated snapshot of a Config, shared by everything in a run.
+
+    Field names match Config so game code can read either one. Drop tables
+    are compiled DropTables and every other table is a FrozenMap, so the
+    spec is hashable and has a stable fingerprint for caching results.
+    """
+    contract_material_drop_chances: DropTable
+    lootbox_loot_drop_chances: DropTable
+    lootbox_pet_drop_chance: float
+    gear_bonus_values: FrozenMap
+    gear_tier_values: FrozenMap
+    dungeon_win_probabilities: FrozenMap
+    dungeon_loot_drop_chances: FrozenMap
+    dungeon_material_drop_chances: FrozenMap
+    dungeon_pet_drop_chances: FrozenMap
+    dungeon_choice_probabilities: FrozenMap
+
+    def compile(self):
+        return self
+
+    def to_dict(self):
+        """Plain nested dict of the settings (tier keys become strings)."""
+        return {name: _plain(getattr(self, name)) for name in self.__dataclass_fields__}
+
+    @property
+    def fingerprint(self):
+        """Hex digest that is equal for equal specs across processes and sessions."""
+        canonical = json.dumps(self.to_dict(), sort_keys=True)
+        return hashlib.sha256(canonical.encode()).hexdigest()
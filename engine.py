@@ -0,0 +1,340 @@
+"""Vectorized simulation engine for whole player cohorts.
+
+CohortEngine follows the same rules as Game/Player (periodic resources,
+play schedule, play_turn, attempt_dungeon, Contract.complete and
+purchase_lootbox) but keeps every player's state in NumPy arrays and
+advances the whole cohort one round at a time with batched operations.
+It is meant for large populations; per-player action logs and per-turn
+series are not kept, only cohort aggregates recorded at a fixed interval
+and the final state of every player.
+
+Rolls come from the same counter-based streams as Game (streams.py), keyed
+on the seed and each player's id, so a player's numbers don't depend on
+the size of the cohort or how it is split across processes.
+"""
+import numpy as np
+
+from samplers import DropTable
+from streams import STREAMS, STREAM_INDEX, new_seed, stream_keys, uniforms_at
+
+# Rarities ordered from lowest to highest gear tier
+RARITIES = ['common', 'uncommon', 'rare', 'epic', 'legendary']
+RARITY_INDEX = {rarity: i for i, rarity in enumerate(RARITIES)}
+TIERS = [1, 2, 3]
+
+# Base weights used by Game.choose_dungeon_tier
+BASE_TIER_WEIGHTS = np.array([10.0, 5.0, 1.0])
+
+
+def compile_table(chances, default):
+    """Compile a rarity -> chance dict into (outcomes, cumulative) arrays.
+
+    outcomes has one extra trailing entry holding the default rarity, which
+    is returned when the roll lands past the cumulative total, exactly like
+    DropTable.draw.
+    """
+    table = DropTable.compile(chances, default)
+    outcomes = [RARITY_INDEX[rarity] for rarity in table.outcomes] + [RARITY_INDEX[table.default]]
+    return np.array(outcomes, dtype=np.int64), np.array(table.cumulative)
+
+
+def stack_tables(tables):
+    """Stack per-tier tables so a tier column can select rows, padding with the default."""
+    width = max(len(cumulative) for _, cumulative in tables)
+    outcomes = np.empty((len(tables), width + 1), dtype=np.int64)
+    cumulative = np.full((len(tables), width), np.inf)
+    for row, (tier_outcomes, tier_cumulative) in enumerate(tables):
+        k = len(tier_cumulative)
+        outcomes[row, :k] = tier_outcomes[:k]
+        outcomes[row, k:] = tier_outcomes[k]
+        cumulative[row, :k] = tier_cumulative
+    return outcomes, cumulative
+
+
+def draw(outcomes, cumulative, u):
+    """Map uniforms to outcomes with a shared table."""
+    return outcomes[np.searchsorted(cumulative, u, side='right')]
+
+
+def draw_rows(outcomes, cumulative, rows, u):
+    """Map uniforms to outcomes using a per-element row of stacked tables."""
+    position = (u[:, None] >= cumulative[rows]).sum(axis=1)
+    return outcomes[rows, position]
+
+
+class CohortEngine:
+    """Struct-of-arrays simulation of a cohort of players."""
+    def __init__(self, config, activity_levels, play_frequencies, rounds_per_day=10,
+                 seed=None, record_interval=None, player_ids=None, archetypes=None, antithetic=False):
+        self.config = config.compile()
+        self.rounds_per_day = rounds_per_day
+        self.seed = new_seed() if seed is None else seed
+        self.record_interval = record_interval or rounds_per_day
+        self.current_day = 1
+        self.current_round = 1
+        self.total_turns = 0
+
+        self.activity_level = np.asarray(activity_levels, dtype=np.float64)
+        self.play_frequency = np.asarray(play_frequencies, dtype=np.int64)
+        n = len(self.activity_level)
+        self.num_players = n
+        # One stream per player and roll type; player_ids defaults to 0..n-1
+        self.player_ids = np.arange(n) if player_ids is None else np.asarray(player_ids)
+        self.stream_keys = stream_keys(self.seed, self.player_ids)
+        self.stream_counters = np.zeros((n, len(STREAMS)), dtype=np.uint64)
+        self.antithetic = antithetic
+        # Optional archetype name per player, carried through to final_state
+        self.archetypes = None if archetypes is None else np.asarray(archetypes)
+        self.last_play_day = np.zeros(n, dtype=np.int64)
+        self.rounds_played = np.zeros(n, dtype=np.int64)
+        with np.errstate(divide='ignore'):
+            self.rounds_between_plays = np.where(
+                self.activity_level > 0, np.floor(1 / self.activity_level), 1
+            ).astype(np.int64)
+
+        # Player state
+        self.yoku = np.full(n, 3, dtype=np.int64)
+        self.pioneer_points = np.full(n, 6, dtype=np.int64)
+        self.skull_tokens = np.zeros(n, dtype=np.int64)
+        self.materials = np.zeros((n, len(RARITIES)), dtype=np.int64)
+        self.gear = np.zeros((n, len(RARITIES)), dtype=np.int8)  # Count of equipped gear per rarity
+        self.pets = np.zeros(n, dtype=np.int64)
+        self.lootboxes_opened = np.zeros(n, dtype=np.int64)
+        self.dungeon_attempts = np.zeros((n, len(TIERS)), dtype=np.int64)
+        self.dungeon_completions = np.zeros((n, len(TIERS)), dtype=np.int64)
+
+        self._compile_rules()
+        self.history = {
+            'turn': [],
+            'day': [],
+            'mean_gear_level': [],
+            'mean_gear_bonus': [],
+            'mean_completions': [],
+            'total_lootboxes': [],
+            'total_pets': [],
+        }
+        for tier in TIERS:
+            self.history[f"tier_{tier}_win_rate"] = []
+
+    def _compile_rules(self):
+        """Turn the config dicts into lookup arrays once per engine."""
+        config = self.config
+        self.gear_tier_values = np.array([config.gear_tier_values.get(r, 0) for r in RARITIES], dtype=np.int64)
+        self.gear_bonus_values = np.array([config.gear_bonus_values.get(r, 0) for r in RARITIES])
+        self.win_probabilities = np.array([config.dungeon_win_probabilities[tier] for tier in TIERS])
+        self.pet_chances = np.array([config.dungeon_pet_drop_chances[tier] for tier in TIERS])
+        choice = config.dungeon_choice_probabilities
+        self.gear_modifiers = np.array([0.0, choice['tier_2']['gear_modifier'], choice['tier_3']['gear_modifier']])
+        self.tier_loot = stack_tables(
+            [compile_table(config.dungeon_loot_drop_chances[tier], 'uncommon') for tier in TIERS])
+        self.tier_material = stack_tables(
+            [compile_table(config.dungeon_material_drop_chances[tier], 'rare') for tier in TIERS])
+        # With tiers rising in RARITIES order, equipping keeps the highest rarities
+        self.monotone_tiers = bool(np.all(np.diff(self.gear_tier_values) > 0))
+        self.contract_material = compile_table(config.contract_material_drop_chances, 'rare')
+        self.lootbox_loot = compile_table(config.lootbox_loot_drop_chances, 'uncommon')
+        self.lootbox_pet_chance = config.lootbox_pet_drop_chance
+
+    # Schedule
+
+    def _players_this_round(self):
+        """Vectorized should_play_today followed by should_play_round."""
+        day = self.current_day
+        if day == 1:
+            self.last_play_day[:] = 1
+            plays_today = np.ones(self.num_players, dtype=bool)
+        else:
+            plays_today = (day - self.last_play_day) >= self.play_frequency
+            self.last_play_day[plays_today & (day > self.last_play_day)] = day - 1
+
+        always = self.activity_level >= 1.0
+        partial = plays_today & ~always & (self.activity_level > 0)
+        plays_round = plays_today & always
+        plays_round[partial] = (self.rounds_played[partial] % self.rounds_between_plays[partial]) == 0
+        self.rounds_played[partial] += 1
+        return np.flatnonzero(plays_round)
+
+    # Actions
+
+    def _uniform(self, idx, stream):
+        """Next value of one stream for every listed player."""
+        column = STREAM_INDEX[stream]
+        u = uniforms_at(self.stream_keys[idx, column], self.stream_counters[idx, column], self.antithetic)
+        self.stream_counters[idx, column] += np.uint64(1)
+        return u
+
+    def _uniforms(self, idx, counts, stream):
+        """The next counts[i] values of one stream for each listed player, concatenated in idx order."""
+        column = STREAM_INDEX[stream]
+        start = np.cumsum(counts) - counts
+        offset = (np.arange(int(counts.sum())) - np.repeat(start, counts)).astype(np.uint64)
+        rows = np.repeat(idx, counts)
+        u = uniforms_at(self.stream_keys[rows, column], self.stream_counters[rows, column] + offset, self.antithetic)
+        self.stream_counters[idx, column] += counts.astype(np.uint64)
+        return u
+
+    def gear_bonus(self, idx):
+        """Gear bonus summed in RARITIES order, the same float sum as Player.sum_gear_bonus."""
+        gear = self.gear[idx]
+        bonus = np.zeros(len(idx))
+        for i, value in enumerate(self.gear_bonus_values):
+            bonus += gear[:, i] * value
+        return bonus
+
+    def gear_level(self):
+        return self.gear.astype(np.int64) @ self.gear_tier_values
+
+    def _add_gear(self, idx, rarity):
+        """Vectorized Player.add_gear for one item per listed player."""
+        gear = self.gear[idx]
+        free = gear.sum(axis=1) < 5
+        lowest = np.argmax(gear > 0, axis=1)
+        upgrade = ~free & (self.gear_tier_values[rarity] > self.gear_tier_values[lowest])
+        self.gear[idx[upgrade], lowest[upgrade]] -= 1
+        equip = free | upgrade
+        self.gear[idx[equip], rarity[equip]] += 1
+
+    def _equip_counts(self, idx, new):
+        """_add_gear for a batch of items per player (counts per rarity): keeps the five highest."""
+        combined = self.gear[idx].astype(np.int64) + new
+        # Fill the five slots from the highest rarity down
+        higher = np.cumsum(combined[:, ::-1], axis=1)[:, ::-1] - combined
+        self.gear[idx] = np.clip(5 - higher, 0, combined)
+
+    def _attempt_dungeons(self, idx):
+        """Tier choice and attempt_dungeon for every listed player."""
+        bonus = self.gear_bonus(idx)
+        weights = BASE_TIER_WEIGHTS + self.gear_modifiers * bonus[:, None]
+        cumulative = np.cumsum(weights / weights.sum(axis=1, keepdims=True), axis=1)
+        position = (self._uniform(idx, 'tier')[:, None] >= cumulative).sum(axis=1)
+        tier = np.where(position < len(TIERS), position, 0)  # 0-based tier index
+
+        self.yoku[idx] -= 1
+        self.dungeon_attempts[idx, tier] += 1
+
+        won = self._uniform(idx, 'win') < self.win_probabilities[tier] + bonus
+        idx, tier = idx[won], tier[won]
+        self.dungeon_completions[idx, tier] += 1
+        loot = draw_rows(*self.tier_loot, tier, self._uniform(idx, 'loot'))
+        self._add_gear(idx, loot)
+        material = draw_rows(*self.tier_material, tier, self._uniform(idx, 'material'))
+        self.materials[idx, material] += 1
+        self.pets[idx] += self._uniform(idx, 'pet') < self.pet_chances[tier]
+        self.skull_tokens[idx] += 1
+        self.pioneer_points[idx] += 1
+
+    def _complete_contracts(self, idx):
+        self.pioneer_points[idx] -= 3
+        self.yoku[idx] += 1
+        material = draw(*self.contract_material, self._uniform(idx, 'contract_material'))
+        self.materials[idx, material] += 1
+
+    def _purchase_lootboxes(self, idx):
+        """Buy and open every lootbox the listed players can afford, all in one batch."""
+        epic, rare = RARITY_INDEX['epic'], RARITY_INDEX['rare']
+        count = np.minimum(np.minimum(self.skull_tokens[idx], self.materials[idx, epic]), self.materials[idx, rare]) // 5
+        buying = count > 0
+        idx, count = idx[buying], count[buying]
+        if not len(idx):
+            return
+        self.skull_tokens[idx] -= 5 * count
+        self.materials[idx, rare] -= 5 * count
+        self.materials[idx, epic] -= 5 * count
+        self.lootboxes_opened[idx] += count
+
+        # One row per lootbox, grouped by player
+        owner = np.repeat(np.arange(len(idx)), count)
+        loot = draw(*self.lootbox_loot, self._uniforms(idx, count, 'lootbox_loot'))
+        pets = self._uniforms(idx, count, 'lootbox_pet') < self.lootbox_pet_chance
+        self.pets[idx] += np.bincount(owner, weights=pets, minlength=len(idx)).astype(np.int64)
+        if self.monotone_tiers:
+            new = np.zeros((len(idx), len(RARITIES)), dtype=np.int64)
+            np.add.at(new, (owner, loot), 1)
+            self._equip_counts(idx, new)
+        else:
+            # Item by item, in the order they were drawn
+            start = np.cumsum(count) - count
+            for k in range(int(count.max())):
+                has = count > k
+                self._add_gear(idx[has], loot[start[has] + k])
+
+    def _play_turns(self, idx):
+        """Vectorized Game.play_turn for every listed player."""
+        can_dungeon = self.yoku[idx] >= 1
+        can_contract = self.pioneer_points[idx] >= 3
+        both = can_dungeon & can_contract
+        # Like Game.play_turn, the action roll is drawn for everyone with an action available
+        acting = can_dungeon | can_contract
+        coin = np.zeros(len(idx), dtype=bool)
+        coin[acting] = self._uniform(idx[acting], 'action') < 0.5
+        dungeon = can_dungeon & (~both | coin)
+        contract = can_contract & (~both | ~coin)
+        self._attempt_dungeons(idx[dungeon])
+        self._complete_contracts(idx[contract])
+        self._purchase_lootboxes(idx[dungeon | contract])
+
+    # Game loop
+
+    def play_round(self):
+        """Advance every player by one round."""
+        if self.total_turns > 0 and self.total_turns % 6 == 0:
+            self.yoku += 1
+            self.pioneer_points += 2
+
+        self._play_turns(self._players_this_round())
+
+        # Sample at the end of each interval (for the default, the last round of the day), like the Game recorder
+        if (self.total_turns + 1) % self.record_interval == 0:
+            self.record_stats()
+
+        self.current_round += 1
+        self.total_turns += 1
+        if self.current_round > self.rounds_per_day:
+            self.current_day += 1
+            self.current_round = 1
+
+    def run(self, days=1):
+        """Run the cohort until the end of the given day."""
+        while self.current_day <= days:
+            self.play_round()
+
+    @property
+    def days_completed(self):
+        return self.total_turns // self.rounds_per_day
+
+    def record_stats(self):
+        """Append cohort aggregates to the history."""
+        history = self.history
+        history['turn'].append(self.total_turns)
+        history['day'].append(self.current_day)
+        history['mean_gear_level'].append(float(self.gear_level().mean()))
+        history['mean_gear_bonus'].append(float((self.gear @ self.gear_bonus_values).mean()))
+        history['mean_completions'].append(float(self.dungeon_completions.sum(axis=1).mean()))
+        history['total_lootboxes'].append(int(self.lootboxes_opened.sum()))
+        history['total_pets'].append(int(self.pets.sum()))
+        attempts = self.dungeon_attempts.sum(axis=0)
+        completions = self.dungeon_completions.sum(axis=0)
+        for i, tier in enumerate(TIERS):
+            history[f"tier_{tier}_win_rate"].append(
+                float(completions[i] / attempts[i] * 100) if attempts[i] > 0 else 0.0)
+
+    def final_state(self):
+        """Per-player final state as a dict of column arrays."""
+        state = {} if self.archetypes is None else {'archetype': self.archetypes}
+        state.update({
+            'activity_level': self.activity_level,
+            'play_frequency': self.play_frequency,
+            'yoku': self.yoku,
+            'pioneer_points': self.pioneer_points,
+            'skull_tokens': self.skull_tokens,
+            'gear_level': self.gear_level(),
+            'pets': self.pets,
+            'lootboxes_opened': self.lootboxes_opened,
+        })
+        for i, rarity in enumerate(RARITIES):
+            state[f"{rarity}_gear"] = self.gear[:, i].astype(np.int64)
+            state[f"{rarity}_materials"] = self.materials[:, i]
+        for i, tier in enumerate(TIERS):
+            state[f"tier_{tier}_attempts"] = self.dungeon_attempts[:, i]
+            state[f"tier_{tier}_completions"] = self.dungeon_completions[:, i]
+        return state
@@ -0,0 +1,355 @@
+"""Structured, lazily rendered action log.
+
+Game events are stored as small integer records (event id, day, round,
+player index and up to three arguments) in compact arrays. Text is only
+produced when a record is read, e.g. by the Action Log tab or an export,
+so long runs don't keep millions of formatted strings around.
+
+Each event has a verbosity level. A log set to OFF stores nothing.
+"""
+import re
+from array import array
+
+import numpy as np
+
+# Verbosity levels
+OFF = 0
+SUMMARY = 1   # Purchases, gear changes, pets and day boundaries
+ACTIONS = 2   # Every action and reward
+DEBUG = 3     # Win chances, skipped rounds and failed checks
+
+LOG_LEVELS = {'off': OFF, 'summary': SUMMARY, 'actions': ACTIONS, 'debug': DEBUG}
+
+RARITIES = ('common', 'uncommon', 'rare', 'epic', 'legendary')
+RARITY_CODES = {rarity: i for i, rarity in enumerate(RARITIES)}
+
+EVENTS = []
+
+
+class Event:
+    """A message template with a verbosity level.
+
+    Arguments are stored as integers; kinds says how to turn each back
+    into text: 'int' as is, 'rarity' via RARITIES and 'pct' as basis
+    points of a probability shown as a percentage.
+    """
+    def __init__(self, name, level, template, kinds=()):
+        self.id = len(EVENTS)
+        self.name = name
+        self.level = level
+        self.template = template
+        self.kinds = kinds
+        EVENTS.append(self)
+
+    def __repr__(self):
+        return f"Event({self.name})"
+
+
+def pct(chance):
+    """Encode a probability for a 'pct' argument."""
+    return round(chance * 10000)
+
+
+TEXT = Event('text', ACTIONS, "{text}")
+START_DAY = Event('start_day', SUMMARY, "Starting Day {0}", ('int',))
+START_ROUND = Event('start_round', DEBUG, "Starting Round {0}", ('int',))
+NOT_PLAYING = Event('not_playing', DEBUG, "{player} not playing on day {0}", ('int',))
+SKIP_ROUND = Event('skip_round', DEBUG, "{player} skipping round due to activity level")
+NO_ACTIONS = Event('no_actions', DEBUG, "{player} has no actions to take this turn")
+PERIODIC_RESOURCES = Event('periodic_resources', ACTIONS, "{player} received 1 yoku and 2 pioneer points")
+NO_YOKU = Event('no_yoku', DEBUG, "{player} does not have enough yoku to enter the dungeon")
+WIN_CHANCE = Event(
+    'win_chance', DEBUG,
+    "{player}'s chance to win was {0} (Base: {1}, Gear Bonus: {2})", ('pct', 'pct', 'pct'))
+DUNGEON_WIN = Event('dungeon_win', ACTIONS, "{player} successfully completed Tier {0} dungeon!", ('int',))
+DUNGEON_FAIL = Event('dungeon_fail', ACTIONS, "{player} failed to complete Tier {0} dungeon", ('int',))
+DUNGEON_MATERIAL = Event('dungeon_material', ACTIONS, "{player} received {0} material", ('rarity',))
+DUNGEON_PET = Event('dungeon_pet', SUMMARY, "{player} received a pet: Pet Tier {0}", ('int',))
+DUNGEON_REWARD = Event('dungeon_reward', ACTIONS, "{player} received a skull token and a pioneer credit")
+NO_PIONEER_POINTS = Event(
+    'no_pioneer_points', DEBUG, "{player} does not have enough pioneer points to complete a contract")
+CONTRACT = Event('contract', ACTIONS, "{player} completed a contract and earned 1 yoku")
+CONTRACT_MATERIAL = Event(
+    'contract_material', ACTIONS, "{player} received {0} material from the contract", ('rarity',))
+NO_LOOTBOX = Event('no_lootbox', DEBUG, "{player} does not have enough resources to purchase a lootbox")
+LOOTBOX = Event('lootbox', SUMMARY, "{player} purchased a lootbox")
+LOOTBOX_PET = Event('lootbox_pet', SUMMARY, "{player} received a pet from the lootbox: Lootbox Pet")
+GEAR_RECEIVED = Event('gear_received', DEBUG, "{player} received {0} gear", ('rarity',))
+GEAR_EQUIPPED = Event('gear_equipped', SUMMARY, "{player} equipped {0} gear", ('rarity',))
+GEAR_REPLACED = Event(
+    'gear_replaced', SUMMARY, "{player} replaced {0} gear with {1} gear", ('rarity', 'rarity'))
+GEAR_DISCARDED = Event(
+    'gear_discarded', ACTIONS, "{player}'s gear slots are full. {0} gear was discarded", ('rarity',))
+
+
+def _decode(kind, value):
+    if kind == 'rarity':
+        return RARITIES[value]
+    if kind == 'pct':
+        return f"{value / 100:.2f}%"
+    return value
+
+
+class EventLog:
+    """Columnar store of event records that reads like a list of strings."""
+    columns = ('event', 'day', 'round', 'player', 'a', 'b', 'c')
+
+    def __init__(self, player_names=(), level=ACTIONS):
+        self.player_names = list(player_names)
+        self.level = level
+        self.texts = []  # Free-text messages, referenced by TEXT records
+        for column in self.columns:
+            setattr(self, column, array('i'))
+
+    def append(self, event, day, round, player=-1, a=0, b=0, c=0):
+        """Store one record; callers check the verbosity level first."""
+        self.event.append(event.id)
+        self.day.append(day)
+        self.round.append(round)
+        self.player.append(player)
+        self.a.append(a)
+        self.b.append(b)
+        self.c.append(c)
+
+    def append_text(self, day, round, message):
+        self.texts.append(message)
+        self.append(TEXT, day, round, -1, len(self.texts) - 1)
+
+    def message(self, i):
+        """Render record i without the day/round prefix."""
+        event = EVENTS[self.event[i]]
+        if event is TEXT:
+            return self.texts[self.a[i]]
+        player = self.player[i]
+        args = [_decode(kind, value) for kind, value in zip(event.kinds, (self.a[i], self.b[i], self.c[i]))]
+        return event.template.format(*args, player=self.player_names[player] if player >= 0 else '')
+
+    def render(self, i):
+        """Render record i the way the old string log did."""
+        return f"[Day {self.day[i]}, Round {self.round[i]}] {self.message(i)}"
+
+    def __len__(self):
+        return len(self.event)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.render(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("event log index out of range")
+        return self.render(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.render(i)
+
+    def export(self, path):
+        """Write the rendered log to a text file."""
+        with open(path, 'w') as f:
+            for message in self:
+                f.write(message + '\n')
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the records and free-text messages."""
+        return (sum(getattr(self, column).buffer_info()[1] * 4 for column in self.columns)
+                + sum(len(text) for text in self.texts if text is not None))
+
+
+class BoundedEventLog(EventLog):
+    """EventLog that keeps the most recent records plus a thinning sample of older ones.
+
+    Up to capacity recent records stay in memory. Older ones leave in
+    chunks: every sample_every-th of them (by position in the full log) is
+    kept as a sample, and when the sample outgrows max_samples it is
+    halved and sample_every doubled, so memory stays bounded however long
+    the run. With spill_path, every record leaving the recent window is
+    appended to that file as rendered text, and export() writes the
+    complete log from the file plus the recent window. The log remembers
+    how much of the file is its own, so one restored from a checkpoint
+    carries on from the right place.
+
+    Indexing, iteration and LogIndex see the kept records (sample, then
+    recent window) in order.
+    """
+    def __init__(self, player_names=(), level=ACTIONS, capacity=100000, sample_every=100, max_samples=10000,
+                 spill_path=None):
+        super().__init__(player_names, level)
+        self.capacity = capacity
+        self.sample_every = sample_every
+        self.max_samples = max_samples
+        self.spill_path = spill_path
+        self.chunk = max(1, capacity // 4)
+        self.total = 0  # Records appended over the whole run
+        self.samples = 0  # Kept records older than the recent window, at the front of the columns
+        self.evicted = 0  # Records that have left the recent window
+        self.positions = array('q')  # Position in the full log of each sampled record
+        self.spilled_bytes = 0  # Length of the spill file that belongs to this log
+
+    def append(self, event, day, round, player=-1, a=0, b=0, c=0):
+        super().append(event, day, round, player, a, b, c)
+        self.total += 1
+        if len(self.event) - self.samples >= self.capacity + self.chunk:
+            self._evict()
+
+    def _evict(self):
+        """Move the oldest chunk of the recent window out: sample it, spill it, drop the rest."""
+        start, stop = self.samples, self.samples + self.chunk
+        if self.spill_path:
+            text = ''.join(self.render(i) + '\n' for i in range(start, stop)).encode()
+            with open(self.spill_path, 'ab' if self.spilled_bytes else 'wb') as f:
+                # A log restored from a checkpoint drops what was spilled after it was saved
+                f.truncate(self.spilled_bytes)
+                f.write(text)
+                self.spilled_bytes = f.tell()
+        first = self.evicted
+        keep = [i for i in range(start, stop) if (first + i - start) % self.sample_every == 0]
+        self.positions.extend(first + i - start for i in keep)
+        self._keep(np.r_[np.arange(start), np.asarray(keep, dtype=np.int64), np.arange(stop, len(self))],
+                   start, stop)
+        self.samples += len(keep)
+        self.evicted += self.chunk
+        if self.samples > self.max_samples:
+            self._thin()
+
+    def _thin(self):
+        """Halve the sample, keeping records on the doubled stride."""
+        self.sample_every *= 2
+        kept = [i for i, position in enumerate(self.positions) if position % self.sample_every == 0]
+        self._keep(np.r_[np.asarray(kept, dtype=np.int64), np.arange(self.samples, len(self))], 0, self.samples)
+        self.positions = array('q', [self.positions[i] for i in kept])
+        self.samples = len(kept)
+
+    def _keep(self, selected, start, stop):
+        """Keep only the records at positions selected, which include everything outside start:stop."""
+        size = len(self)
+        events = np.frombuffer(self.event, dtype=np.int32, count=size)
+        dropped = np.setdiff1d(np.arange(start, stop), selected, assume_unique=True)
+        for i in dropped[events[dropped] == TEXT.id].tolist():
+            self.texts[self.a[i]] = None  # Release the message; its slot keeps later references valid
+        for column in self.columns:
+            values = np.frombuffer(getattr(self, column), dtype=np.int32, count=size)[selected]
+            setattr(self, column, array('i', values.tobytes()))
+
+    def export(self, path):
+        """Write the log to a text file: all of it when spilling, else the kept records."""
+        if not self.spill_path:
+            super().export(path)
+            return
+        with open(path, 'wb') as f:
+            if self.spilled_bytes:
+                with open(self.spill_path, 'rb') as spilled:
+                    remaining = self.spilled_bytes
+                    while remaining:
+                        block = spilled.read(min(remaining, 1 << 20))
+                        if not block:
+                            break
+                        f.write(block)
+                        remaining -= len(block)
+            for i in range(self.samples, len(self)):
+                f.write((self.render(i) + '\n').encode())
+
+
+class LogIndex:
+    """Query index over an EventLog, built once per finished simulation.
+
+    Records are grouped by player, day and event type so those filters
+    are answered from sorted positions instead of a scan, and free-text
+    search is resolved against the small vocabulary behind the records
+    (template words, player names, rarities and numbers) rather than by
+    rendering every message. A search matches an entry when every word of
+    the query appears in it, also inside a word or number ("5" matches
+    "15", "80.00" matches "80.00%").
+    """
+    def __init__(self, log):
+        self.log = log
+        self.size = len(log)
+        self.columns = {
+            column: np.frombuffer(getattr(log, column), dtype=np.int32, count=self.size).copy()
+            for column in EventLog.columns
+        }
+        self._groups = {column: self._group(self.columns[column]) for column in ('player', 'day', 'event')}
+        # Static words of each template, placeholders removed
+        self._template_text = [re.sub(r"\{[^}]*\}", " ", event.template).lower() for event in EVENTS]
+
+    @staticmethod
+    def _group(values):
+        order = np.argsort(values, kind='stable')
+        return order, values[order]
+
+    def _positions(self, column, keys):
+        """Sorted positions of records whose column value is in keys."""
+        order, sorted_values = self._groups[column]
+        keys = np.asarray(keys)
+        starts = np.searchsorted(sorted_values, keys, side='left')
+        ends = np.searchsorted(sorted_values, keys, side='right')
+        parts = [order[start:end] for start, end in zip(starts, ends)]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def _word_mask(self, word, positions):
+        """Which of the given records mention the word anywhere in their text."""
+        columns = {name: values[positions] for name, values in self.columns.items()}
+        events = columns['event']
+        mask = np.zeros(len(positions), dtype=bool)
+        if word in "day" or word in "round":
+            mask[:] = True
+            return mask
+
+        template_hits = [event.id for event in EVENTS if word in self._template_text[event.id]]
+        mask |= np.isin(events, template_hits)
+
+        names = [i for i, name in enumerate(self.log.player_names) if word in name.lower()]
+        mask |= np.isin(columns['player'], names)
+
+        mask |= self._value_hits('int', columns['day'], word) | self._value_hits('int', columns['round'], word)
+        for event in EVENTS:
+            if not event.kinds:
+                continue
+            is_event = events == event.id
+            if not is_event.any():
+                continue
+            for kind, arg in zip(event.kinds, ('a', 'b', 'c')):
+                mask[is_event] |= self._value_hits(kind, columns[arg][is_event], word)
+
+        texts = np.flatnonzero(events == TEXT.id)
+        for i in texts:
+            if word in self.log.texts[columns['a'][i]].lower():
+                mask[i] = True
+        return mask
+
+    @staticmethod
+    def _value_hits(kind, values, word):
+        """Which argument values contain the word once rendered as in the message."""
+        matching = [value for value in np.unique(values).tolist() if word in str(_decode(kind, value)).lower()]
+        return np.isin(values, matching)
+
+    def query(self, players=None, days=None, event_names=None, text=''):
+        """Positions of the records that pass every given filter.
+
+        players is a list of player indices, days an inclusive (first, last)
+        pair and event_names a list of Event names.
+        """
+        positions = np.arange(self.size)
+        if players is not None:
+            positions = np.intersect1d(positions, self._positions('player', players), assume_unique=True)
+        if event_names is not None:
+            ids = [event.id for event in EVENTS if event.name in event_names]
+            positions = np.intersect1d(positions, self._positions('event', ids), assume_unique=True)
+        if days is not None:
+            first, last = days
+            day_positions = self._positions('day', np.arange(first, last + 1))
+            positions = np.intersect1d(positions, day_positions, assume_unique=True)
+        for word in text.lower().split():
+            positions = positions[self._word_mask(word, positions)]
+        return positions
+
+    def rows(self, positions):
+        """Day, round, player and message for the given records."""
+        names = self.log.player_names
+        rows = []
+        for i in positions.tolist():
+            player = self.log.player[i]
+            rows.append((self.log.day[i], self.log.round[i], names[player] if player >= 0 else '',
+                         self.log.message(i)))
+        return rows
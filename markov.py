@@ -0,0 +1,409 @@
+"""Expected progression of one player as a Markov chain.
+
+A player's future only depends on their gear histogram, yoku, pioneer
+points, skull tokens and epic/rare materials; everything else (other
+materials, pets, completions) is a reward collected along the way. When
+the player acts is deterministic (Player.should_play_today and
+should_play_round, periodic resources every 6 rounds), so instead of
+sampling, MarkovSolver pushes the whole probability distribution over
+states through the same rules as play_turn, attempt_dungeon,
+Contract.complete and purchase_lootbox, one round at a time.
+
+What this buys is a result without sampling noise, for one schedule at a
+time, and a first-passage distribution (e.g. days until the fifth
+legendary item) that sampling would need many replicates to resolve. It
+is neither exact (see the approximations below) nor a faster way to get
+mean curves: the number of states grows with how often a player plays,
+and for a daily player over 30 days (tens of thousands of states) one
+solve takes about as long as a 40 000-player CohortEngine run. For
+population means, use the cohort engine.
+
+The distribution is kept sparse: a state is a mixed-radix code, every
+outcome of a round is a code delta, and equal codes are merged with a
+bincount. Two things keep it finite:
+
+* Currencies saturate at CAPS: a value at its cap stands for "cap or
+  more" and is not spent down. The rules only ever compare currencies
+  with 1, 3 or 5, so this changes nothing until a spend from a capped
+  value takes the real amount below those thresholds. The 'capped'
+  series is the mass of spends made from a capped value, an upper bound
+  on how much the caps could have mattered; raise the caps if it is not
+  small. With the default CAPS it is not small for frequent players
+  (about 5.8 for a daily player over 30 days, 3.8 for the Casual
+  archetype), so their curves are approximations: a daily player's gear
+  level and completions came within the sampling error of 400 simulated
+  players, but only re-solving with higher caps bounds the difference.
+  Expected currency holdings are tracked as rewards and don't depend on
+  the caps at all.
+* States below tolerance are dropped; the dropped mass is the
+  'truncated' series.
+
+Usage:
+    python -m markov scenario.json -o expected.csv [--legendary 5]
+"""
+import argparse
+import itertools
+import json
+import sys
+
+import numpy as np
+
+from classes import Player
+from config import Config
+from events import RARITIES
+from samplers import DropTable, TierChooser
+
+TIERS = [1, 2, 3]
+RARITY_INDEX = {rarity: i for i, rarity in enumerate(RARITIES)}
+EPIC, RARE = RARITY_INDEX['epic'], RARITY_INDEX['rare']
+
+# Largest value tracked for each currency
+CAPS = {'yoku': 30, 'pioneer_points': 60, 'skull_tokens': 10, 'epic': 10, 'rare': 10}
+STATE = ('gear', 'yoku', 'pioneer_points', 'skull_tokens', 'epic', 'rare', 'hit')
+
+
+def outcome_probabilities(table):
+    """Probability of each outcome of a DropTable (its default gets the leftover mass)."""
+    probabilities = {}
+    previous = 0.0
+    for outcome, cumulative in zip(table.outcomes, table.cumulative):
+        probabilities[outcome] = probabilities.get(outcome, 0.0) + max(0.0, min(cumulative, 1.0) - previous)
+        previous = max(previous, min(cumulative, 1.0))
+    probabilities[table.default] = probabilities.get(table.default, 0.0) + max(0.0, 1.0 - previous)
+    return {outcome: p for outcome, p in probabilities.items() if p > 0}
+
+
+def legendary_items(n):
+    """Target for first_passage: at least n legendary items equipped."""
+    return lambda histograms: histograms[:, RARITY_INDEX['legendary']] >= n
+
+
+def gear_level_at_least(level, config):
+    """Target for first_passage: gear level (sum of tier values) of at least level."""
+    values = np.array([config.gear_tier_values.get(rarity, 0) for rarity in RARITIES])
+    return lambda histograms: histograms @ values >= level
+
+
+class GearStates:
+    """Every inventory of up to 5 items as a rarity histogram, with add_gear as a lookup table."""
+    def __init__(self, spec):
+        self.histograms = np.array([h for h in itertools.product(range(6), repeat=len(RARITIES)) if sum(h) <= 5])
+        index = {tuple(h): i for i, h in enumerate(self.histograms.tolist())}
+        tier_values = [spec.gear_tier_values.get(rarity, 0) for rarity in RARITIES]
+        bonus_values = [spec.gear_bonus_values.get(rarity, 0) for rarity in RARITIES]
+
+        self.level = self.histograms @ np.array(tier_values)
+        # Summed in RARITIES order, like Player.sum_gear_bonus
+        self.bonus = np.zeros(len(self.histograms))
+        for i, value in enumerate(bonus_values):
+            self.bonus += self.histograms[:, i] * value
+        self.equip = np.empty((len(self.histograms), len(RARITIES)), dtype=np.int64)
+        for g, histogram in enumerate(self.histograms.tolist()):
+            for code in range(len(RARITIES)):
+                new = list(histogram)
+                if sum(histogram) < 5:
+                    new[code] += 1
+                else:
+                    lowest = min((i for i in range(len(RARITIES)) if histogram[i]), key=lambda i: tier_values[i])
+                    if tier_values[code] > tier_values[lowest]:
+                        new[lowest] -= 1
+                        new[code] += 1
+                self.equip[g, code] = index[tuple(new)]
+        self.empty = index[(0,) * len(RARITIES)]
+
+
+class MarkovSolver:
+    """Expected trajectory of a player with the given schedule under a config."""
+    def __init__(self, config, activity_level=1.0, play_frequency=1, rounds_per_day=10,
+                 caps=None, tolerance=1e-10, target=None):
+        self.config = config.compile()
+        self.activity_level = activity_level
+        self.play_frequency = play_frequency
+        self.rounds_per_day = rounds_per_day
+        self.caps = {**CAPS, **(caps or {})}
+        self.tolerance = tolerance
+        self.gear = GearStates(self.config)
+        # Sticky flag: has the target been reached yet
+        self.target = np.zeros(len(self.gear.histograms), dtype=np.int64) if target is None \
+            else np.asarray(target(self.gear.histograms), dtype=np.int64)
+        self.radix = [len(self.gear.histograms)] + [self.caps[name] + 1 for name in STATE[1:-1]] + [2]
+        self.stride = {name: int(np.prod(self.radix[i + 1:])) for i, name in enumerate(STATE)}
+        self._compile_rules()
+
+    def _compile_rules(self):
+        spec = self.config
+        # Tier choice per gear state, from the same tables as Game.choose_dungeon_tier
+        chooser = TierChooser(spec.dungeon_choice_probabilities)
+        self.tier_probabilities = np.zeros((len(self.gear.histograms), len(TIERS)))
+        for g, bonus in enumerate(self.gear.bonus):
+            for tier, p in outcome_probabilities(chooser.table(bonus)).items():
+                self.tier_probabilities[g, TIERS.index(tier)] += p
+        self.win_chance = np.clip(
+            np.array([spec.dungeon_win_probabilities[tier] for tier in TIERS])[None, :] + self.gear.bonus[:, None], 0, 1)
+        self.tier_loot = [outcome_probabilities(DropTable.compile(spec.dungeon_loot_drop_chances[tier], 'uncommon'))
+                          for tier in TIERS]
+        self.tier_material = [self._material_groups(DropTable.compile(spec.dungeon_material_drop_chances[tier], 'rare'))
+                              for tier in TIERS]
+        self.pet_chance = [spec.dungeon_pet_drop_chances[tier] for tier in TIERS]
+        self.contract_material = self._material_groups(DropTable.compile(spec.contract_material_drop_chances, 'rare'))
+        self.lootbox_loot = outcome_probabilities(DropTable.compile(spec.lootbox_loot_drop_chances, 'uncommon'))
+        self.lootbox_pet_chance = spec.lootbox_pet_drop_chance
+
+    @staticmethod
+    def _material_groups(table):
+        """Material outcomes as (state column or None, probability, expected count per rarity)."""
+        groups = {}
+        for rarity, p in outcome_probabilities(table).items():
+            column = {'epic': 'epic', 'rare': 'rare'}.get(rarity)
+            _, total, counts = groups.get(column, (column, 0.0, np.zeros(len(RARITIES))))
+            counts[RARITY_INDEX[rarity]] += p
+            groups[column] = (column, total + p, counts)
+        return list(groups.values())
+
+    def schedule(self, days):
+        """Whether the player plays each round, from Player's own schedule logic."""
+        player = Player("schedule", self.config, self.activity_level, self.play_frequency)
+        plays = []
+        for day in range(1, days + 1):
+            for _ in range(self.rounds_per_day):
+                plays.append(player.should_play_today(day) and player.should_play_round())
+        return plays
+
+    # Distribution: parallel arrays of state codes and probabilities
+
+    def _decode(self, codes):
+        """Dict of state columns for an array of codes."""
+        columns = {}
+        for name, size in zip(reversed(STATE), reversed(self.radix)):
+            columns[name] = codes % size
+            codes = codes // size
+        return columns
+
+    def _raise(self, columns, name, amount):
+        """Code delta for adding amount to a currency, held at its cap."""
+        return (np.minimum(columns[name] + amount, self.caps[name]) - columns[name]) * self.stride[name]
+
+    def _spend(self, columns, name, amount, weights):
+        """Code delta for spending amount of a currency.
+
+        A currency at its cap stands for "cap or more" and is not spent
+        down; the mass that relied on that is counted in self.capped.
+        """
+        at_cap = columns[name] >= self.caps[name]
+        self.capped += weights[at_cap].sum()
+        return np.where(at_cap, 0, -amount * self.stride[name])
+
+    def _equip(self, columns, rarity):
+        """Code delta for add_gear (plus the target flag it may set)."""
+        g = columns['gear']
+        new = self.gear.equip[g, RARITY_INDEX[rarity]]
+        reached = self.target[new] & (1 - columns['hit'])
+        return (new - g) * self.stride['gear'] + reached
+
+    def _merge(self, pieces):
+        """Add up the probability of equal states and drop negligible ones."""
+        codes, inverse = np.unique(np.concatenate([codes for codes, _ in pieces]), return_inverse=True)
+        weights = np.bincount(inverse, weights=np.concatenate([weights for _, weights in pieces]),
+                              minlength=len(codes))
+        keep = weights >= self.tolerance
+        self.truncated += weights[~keep].sum()
+        return codes[keep], weights[keep]
+
+    def _tick(self, codes, weights, rewards):
+        """Periodic resources: +1 yoku, +2 pioneer points."""
+        columns = self._decode(codes)
+        rewards['currencies'] += weights.sum() * np.array([1, 2, 0])
+        return codes + self._raise(columns, 'yoku', 1) + self._raise(columns, 'pioneer_points', 2)
+
+    def _turn(self, codes, weights, rewards):
+        """One play_turn for every state, followed by the lootbox purchases."""
+        columns = self._decode(codes)
+        can_dungeon = columns['yoku'] >= 1
+        can_contract = columns['pioneer_points'] >= 3
+        both = can_dungeon & can_contract
+        p_dungeon = np.where(both, 0.5, can_dungeon)
+        p_contract = np.where(both, 0.5, can_contract)
+        pieces = []
+
+        idle = ~can_dungeon & ~can_contract
+        pieces.append((codes[idle], weights[idle]))
+
+        # Contract: -3 pioneer points, +1 yoku, one material
+        mask = p_contract > 0
+        if mask.any():
+            w = weights[mask] * p_contract[mask]
+            sub = {name: column[mask] for name, column in columns.items()}
+            rewards['currencies'] += w.sum() * np.array([1, -3, 0])
+            base = codes[mask] + self._spend(sub, 'pioneer_points', 3, w) + self._raise(sub, 'yoku', 1)
+            for column, p, counts in self.contract_material:
+                rewards['materials'] += counts * w.sum()
+                pieces.append((base if column is None else base + self._raise(sub, column, 1), w * p))
+
+        # Dungeon: -1 yoku, tier choice, win roll, then loot, material, pet and currency on a win
+        mask = p_dungeon > 0
+        if mask.any():
+            w_dungeon = weights[mask] * p_dungeon[mask]
+            sub = {name: column[mask] for name, column in columns.items()}
+            rewards['currencies'] += w_dungeon.sum() * np.array([-1, 0, 0])
+            base = codes[mask] + self._spend(sub, 'yoku', 1, w_dungeon)
+            g = sub['gear']
+            for t, tier in enumerate(TIERS):
+                w_tier = w_dungeon * self.tier_probabilities[g, t]
+                w_win = w_tier * self.win_chance[g, t]
+                rewards['attempts'][t] += w_tier.sum()
+                rewards['completions'][t] += w_win.sum()
+                rewards['pets'] += w_win.sum() * self.pet_chance[t]
+                rewards['currencies'] += w_win.sum() * np.array([0, 1, 1])
+                pieces.append((base, w_tier - w_win))
+                won = base + self._raise(sub, 'pioneer_points', 1) + self._raise(sub, 'skull_tokens', 1)
+                for loot, p_loot in self.tier_loot[t].items():
+                    looted = won + self._equip(sub, loot)
+                    for column, p, counts in self.tier_material[t]:
+                        w = w_win * (p_loot * p)
+                        rewards['materials'] += counts * (w_win.sum() * p_loot)
+                        pieces.append((looted if column is None else looted + self._raise(sub, column, 1), w))
+
+        codes, weights = self._merge(pieces)
+        return self._lootboxes(codes, weights, rewards)
+
+    def _lootboxes(self, codes, weights, rewards):
+        """Buy lootboxes while affordable, like the loop at the end of play_turn.
+
+        A state with all three currencies at their caps never runs out
+        (spending at the cap is a no-op), so it buys one box and stops.
+        """
+        finished = []
+        while True:
+            columns = self._decode(codes)
+            buying = (columns['skull_tokens'] >= 5) & (columns['epic'] >= 5) & (columns['rare'] >= 5)
+            if not buying.any():
+                codes, weights = self._merge([(codes, weights)] + finished)
+                return codes, weights
+            stuck = buying & (columns['skull_tokens'] >= self.caps['skull_tokens']) \
+                & (columns['epic'] >= self.caps['epic']) & (columns['rare'] >= self.caps['rare'])
+            pieces = [(codes[~buying], weights[~buying])]
+            w = weights[buying]
+            sub = {name: column[buying] for name, column in columns.items()}
+            rewards['lootboxes'] += w.sum()
+            rewards['pets'] += w.sum() * self.lootbox_pet_chance
+            rewards['materials'][EPIC] -= 5 * w.sum()
+            rewards['materials'][RARE] -= 5 * w.sum()
+            rewards['currencies'][2] -= 5 * w.sum()
+            base = codes[buying]
+            for name in ('skull_tokens', 'epic', 'rare'):
+                base = base + self._spend(sub, name, 5, w)
+            stuck = stuck[buying]
+            for loot, p in self.lootbox_loot.items():
+                looted = base + self._equip(sub, loot)
+                pieces.append((looted[~stuck], w[~stuck] * p))
+                finished.append((looted[stuck], w[stuck] * p))
+            codes, weights = self._merge(pieces)
+
+    def solve(self, days):
+        """Expected state after every round of days days; returns a MarkovResult."""
+        self.truncated = 0.0
+        self.capped = 0.0
+        start = {'gear': self.gear.empty, 'yoku': 3, 'pioneer_points': 6, 'skull_tokens': 0, 'epic': 0, 'rare': 0,
+                 'hit': self.target[self.gear.empty]}
+        codes = np.array([sum(start[name] * self.stride[name] for name in STATE)], dtype=np.int64)
+        weights = np.ones(1)
+        rewards = {
+            'attempts': np.zeros(len(TIERS)), 'completions': np.zeros(len(TIERS)),
+            'materials': np.zeros(len(RARITIES)), 'lootboxes': 0.0, 'pets': 0.0,
+            # yoku, pioneer points, skull tokens gained minus spent
+            'currencies': np.array([3.0, 6.0, 0.0])
+        }
+        series = {name: [] for name in ('turn', 'day', 'round', 'gear_level', 'gear_bonus', 'yoku', 'pioneer_points',
+                                        'skull_tokens', 'completions', 'lootboxes', 'pets', 'first_passage',
+                                        'truncated', 'capped', 'states')}
+        for tier in TIERS:
+            series[f"tier_{tier}_attempts"] = []
+            series[f"tier_{tier}_completions"] = []
+        for rarity in RARITIES:
+            series[f"{rarity}_materials"] = []
+
+        for turn, plays in enumerate(self.schedule(days)):
+            if turn > 0 and turn % 6 == 0:
+                codes = self._tick(codes, weights, rewards)
+            if plays:
+                codes, weights = self._turn(codes, weights, rewards)
+            self._record(series, turn, codes, weights, rewards)
+        return MarkovResult({name: np.array(values) for name, values in series.items()}, self.rounds_per_day)
+
+    def _record(self, series, turn, codes, weights, rewards):
+        columns = self._decode(codes)
+        g = columns['gear']
+        series['turn'].append(turn)
+        series['day'].append(turn // self.rounds_per_day + 1)
+        series['round'].append(turn % self.rounds_per_day + 1)
+        series['gear_level'].append(weights @ self.gear.level[g])
+        series['gear_bonus'].append(weights @ self.gear.bonus[g])
+        # Currencies are tracked as rewards, so their expectations don't depend on the caps
+        for name, value in zip(('yoku', 'pioneer_points', 'skull_tokens'), rewards['currencies']):
+            series[name].append(value)
+        series['completions'].append(rewards['completions'].sum())
+        series['lootboxes'].append(rewards['lootboxes'])
+        series['pets'].append(rewards['pets'])
+        series['first_passage'].append(weights @ columns['hit'])
+        series['truncated'].append(self.truncated)
+        series['capped'].append(self.capped)
+        series['states'].append(len(weights))
+        for t, tier in enumerate(TIERS):
+            series[f"tier_{tier}_attempts"].append(rewards['attempts'][t])
+            series[f"tier_{tier}_completions"].append(rewards['completions'][t])
+        for i, rarity in enumerate(RARITIES):
+            series[f"{rarity}_materials"].append(rewards['materials'][i])
+
+
+class MarkovResult:
+    """Expected value of every stat after each round, plus the first-passage CDF."""
+    def __init__(self, series, rounds_per_day):
+        self.series = series
+        self.rounds_per_day = rounds_per_day
+
+    def __getitem__(self, name):
+        return self.series[name]
+
+    def daily(self):
+        """The series sampled at the end of each day."""
+        end_of_day = self.series['round'] == self.rounds_per_day
+        return {name: values[end_of_day] for name, values in self.series.items()}
+
+    def first_passage_by_day(self):
+        """P(target first reached on day d) for d = 1..days; the rest is 1 - sum."""
+        cdf = self.daily()['first_passage']
+        return np.diff(cdf, prepend=0.0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Expected progression for each player of a scenario, without sampling noise.")
+    parser.add_argument('scenario', help="Scenario JSON file (see simulate.py)")
+    parser.add_argument('-o', '--out', default='expected.csv', help="Output CSV, one row per player and day")
+    parser.add_argument('--legendary', type=int, default=None,
+                        help="Also compute the distribution of days until this many legendary items")
+    args = parser.parse_args(argv)
+
+    with open(args.scenario) as f:
+        scenario = json.load(f)
+    config = Config()
+    config.update_from_user_input(scenario)
+    settings = scenario.get('simulation_settings', {})
+    target = legendary_items(args.legendary) if args.legendary else None
+
+    import pandas as pd
+
+    frames = []
+    for p_config in scenario.get('players', []):
+        solver = MarkovSolver(config, p_config.get('activity_level', 1.0), p_config.get('play_frequency', 1),
+                              rounds_per_day=settings.get('rounds_per_day', 10), target=target)
+        result = solver.solve(settings.get('simulation_days', 10))
+        frame = pd.DataFrame(result.daily())
+        frame.insert(0, 'player', p_config['name'])
+        frames.append(frame)
+        print(f"{p_config['name']}: truncated {result['truncated'][-1]:.2e}, capped {result['capped'][-1]:.2e}, "
+              f"up to {result['states'].max()} states", file=sys.stderr)
+    pd.concat(frames).to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Memory budgets for long runs, and a report of where a run's memory went.
+
+A run's memory grows with two structures: the action log (one record
+per logged event) and the recorders (one sample per player per recorded
+turn). Given a budget in megabytes, plan() splits it between them: the
+log becomes an events.BoundedEventLog that keeps as many recent records
+as its share allows plus a thinning sample of older ones (optionally
+spilling the rest to a file), and the stats sampling interval is widened
+until every player's full series fits in the recorders' share.
+
+    budget = plan(64, players=500, days=180, rounds_per_day=24)
+    game = Game(players, config, record_every=budget.record_every,
+                action_log=budget.action_log(names, log_level, spill_path='log.txt'))
+    peak, _ = traced_peak(game.run, 180)
+    memory_report(game, peak)       (bytes per structure, plus the traced peak)
+
+The budget covers these two structures only; the players' own state and
+their random streams are small and fixed, and are reported separately.
+"""
+import sys
+import tracemalloc
+from array import array
+
+import numpy as np
+
+from events import BoundedEventLog, EventLog
+from recorder import MATERIALS, TIERS
+
+LOG_RECORD_BYTES = 4 * len(EventLog.columns)
+# Turn (int32), gear level (int16), materials and completions (int32), win rates (float32)
+SAMPLE_BYTES = 4 + 2 + 4 * len(MATERIALS) + 4 + 4 * len(TIERS)
+
+MIN_LOG_CAPACITY = 1000
+
+
+class MemoryBudget:
+    """Log capacity and stats sampling interval that keep a run within budget_mb."""
+    def __init__(self, budget_mb, log_capacity, max_samples, record_every):
+        self.budget_mb = budget_mb
+        self.log_capacity = log_capacity
+        self.max_samples = max_samples
+        self.record_every = record_every
+
+    def action_log(self, player_names, level, spill_path=None):
+        return BoundedEventLog(player_names, level, capacity=self.log_capacity, max_samples=self.max_samples,
+                               spill_path=spill_path)
+
+    def __repr__(self):
+        return (f"MemoryBudget({self.budget_mb} MB: log {self.log_capacity} recent + {self.max_samples} sampled, "
+                f"record_every={self.record_every!r})")
+
+
+def plan(budget_mb, players, days, rounds_per_day, record_every=1, log_share=0.5):
+    """Split budget_mb between the action log (log_share of it) and the recorders.
+
+    record_every is the requested sampling interval; it is kept when the
+    series fit, and otherwise replaced by the smallest whole number of
+    rounds that does.
+    """
+    budget = budget_mb * 1024 * 1024
+    samples_budget = budget * (1 - log_share)
+    interval = rounds_per_day if record_every == 'day' else record_every
+    needed = -(-players * days * rounds_per_day * SAMPLE_BYTES // int(max(samples_budget, 1)))
+    if needed > interval:
+        record_every = needed
+    # The window holds up to 1.25x its capacity between evictions; leave a fifth for the sample
+    records = int(budget * log_share) // LOG_RECORD_BYTES
+    return MemoryBudget(budget_mb, max(int(records * 0.6), MIN_LOG_CAPACITY), max(records // 5, 1), record_every)
+
+
+def traced_peak(func, *args, **kwargs):
+    """Call func under tracemalloc and return (peak bytes, result)."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        result = func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def _sizeof(obj, seen=None):
+    """Bytes held by obj and the containers and arrays it references."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, array):
+        return size
+    if isinstance(obj, dict):
+        size += sum(_sizeof(key, seen) + _sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += _sizeof(vars(obj), seen)
+    elif hasattr(type(obj), '__slots__'):
+        size += sum(_sizeof(getattr(obj, name), seen) for name in type(obj).__slots__ if hasattr(obj, name))
+    return size
+
+
+def result_nbytes(result):
+    """Bytes held by a finished Game (the structures memory_report counts) or CohortEngine."""
+    if hasattr(result, 'action_log'):
+        report = memory_report(result)
+        return sum(report[name] for name in ('action_log', 'recorders', 'players', 'streams'))
+    return _sizeof(result, {id(getattr(result, 'config', None))})
+
+
+def memory_report(game, peak=None):
+    """Bytes held by each structure of a finished game, plus the traced peak when given."""
+    log = game.action_log
+    recorders = sum(player.recorder.nbytes for player in game.players)
+    streams = sum(_sizeof(player.rng) for player in game.players)
+    # Skip what is counted above, and the compiled config every player shares
+    seen = {id(game.config)}
+    for player in game.players:
+        seen.update((id(player.recorder), id(player.rng)))
+    players = sum(_sizeof(player, seen) for player in game.players)
+    report = {
+        'action_log': log.nbytes,
+        'recorders': recorders,
+        'players': players,
+        'streams': streams,
+        'log_records': len(log),
+        'recorded_samples': sum(player.recorder.size for player in game.players),
+    }
+    if isinstance(log, BoundedEventLog):
+        report['logged_events'] = log.total
+        # Records that left the recent window (written to the spill file, if any), and those of them still sampled
+        report['log_evicted'] = log.evicted
+        report['log_sampled'] = log.samples
+    if peak is not None:
+        report['peak'] = peak
+    return report
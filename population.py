@@ -0,0 +1,99 @@
+"""Player populations defined as archetype mixtures.
+
+Instead of listing players one by one, a population gives a size and the
+share of each archetype, with optional jitter so players of the same
+archetype don't all behave identically:
+
+    "population": {
+        "size": 20000,
+        "mix": {"Casual": 0.6, "Hardcore": 0.3, "No-Life": 0.1},
+        "activity_jitter": 0.1,      (activity_level +- up to 0.1)
+        "frequency_jitter": 1,       (play_frequency +- up to 1 day)
+        "archetypes": {"Weekender": [0.5, 7]}   (optional extra archetypes)
+    }
+
+Players only exist as columns of a CohortEngine (see engine.py), so tens
+of thousands of them cost a few arrays rather than a Player object each.
+Results are summarized per archetype and for the population as a whole.
+"""
+import numpy as np
+
+# name -> (activity_level, play_frequency)
+ARCHETYPES = {
+    "No-Life": (1.0, 1),
+    "Hardcore": (0.7, 1),
+    "Casual": (0.3, 2),
+    "Ultra Casual": (0.2, 5)
+}
+
+# Final-state columns summarized per archetype
+SUMMARY_METRICS = ['gear_level', 'completions', 'lootboxes_opened', 'pets', 'yoku', 'pioneer_points',
+                   'skull_tokens', 'epic_materials', 'rare_materials']
+PERCENTILES = (10, 50, 90)
+
+
+def allocate(size, mix):
+    """Split size players across the mix shares (largest remainder, so counts sum to size)."""
+    names = list(mix)
+    shares = np.array([mix[name] for name in names], dtype=np.float64)
+    if shares.sum() <= 0:
+        raise ValueError("Population mix must have at least one positive share")
+    exact = shares / shares.sum() * size
+    counts = np.floor(exact).astype(np.int64)
+    # Hand the leftover players to the largest fractional parts, first listed wins ties
+    leftover = size - counts.sum()
+    counts[np.argsort(-(exact - counts), kind='stable')[:leftover]] += 1
+    return dict(zip(names, counts.tolist()))
+
+
+def sample_population(spec, seed=None):
+    """Per-player columns for a population spec.
+
+    Returns a dict with 'archetype' (names), 'activity_level' and
+    'play_frequency' arrays, grouped by archetype in mix order.
+    """
+    archetypes = {**ARCHETYPES, **{name: tuple(value) for name, value in spec.get('archetypes', {}).items()}}
+    unknown = [name for name in spec['mix'] if name not in archetypes]
+    if unknown:
+        raise ValueError(f"Unknown archetypes: {', '.join(unknown)}")
+    counts = allocate(spec['size'], spec['mix'])
+    rng = np.random.default_rng(seed)
+
+    names = np.repeat(list(counts), list(counts.values()))
+    activity = np.array([archetypes[name][0] for name in names], dtype=np.float64)
+    frequency = np.array([archetypes[name][1] for name in names], dtype=np.int64)
+    activity_jitter = spec.get('activity_jitter', 0.0)
+    if activity_jitter:
+        activity = np.clip(activity + rng.uniform(-activity_jitter, activity_jitter, len(names)), 0.0, 1.0)
+    frequency_jitter = int(spec.get('frequency_jitter', 0))
+    if frequency_jitter:
+        frequency = np.maximum(frequency + rng.integers(-frequency_jitter, frequency_jitter + 1, len(names)), 1)
+    return {'archetype': names, 'activity_level': activity, 'play_frequency': frequency}
+
+
+def summarize(engine):
+    """Population-level outcomes: one row per archetype plus an 'All' row.
+
+    Each metric gets its mean and PERCENTILES over the players in the group.
+    """
+    import pandas as pd
+
+    state = engine.final_state()
+    frame = pd.DataFrame({
+        'archetype': state['archetype'] if 'archetype' in state else np.full(engine.num_players, 'All'),
+        'completions': sum(state[f"tier_{tier}_completions"] for tier in (1, 2, 3)),
+        **{name: state[name] for name in SUMMARY_METRICS if name != 'completions'}
+    })
+    groups = [(name, frame[frame['archetype'] == name]) for name in dict.fromkeys(frame['archetype'])]
+    if len(groups) > 1:
+        groups.append(('All', frame))
+    rows = []
+    for name, group in groups:
+        row = {'archetype': name, 'players': len(group)}
+        for metric in SUMMARY_METRICS:
+            values = group[metric].to_numpy()
+            row[f"{metric}_mean"] = float(values.mean())
+            for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                row[f"{metric}_p{q}"] = float(value)
+        rows.append(row)
+    return pd.DataFrame(rows)
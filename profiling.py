@@ -0,0 +1,217 @@
+"""Toggleable per-phase profiling of simulation runs.
+
+While any Profiler is enabled, the methods behind each phase of a run
+(see PHASES) are swapped for timing wrappers on their classes and
+modules; disabling puts the originals back. A run that isn't profiled
+executes exactly the original code, so profiling costs nothing when off.
+
+    profiler = Profiler()
+    with profiler:
+        game.run(days)
+        game.plot_stats()
+    profiler.table()            (calls, total and mean time, share, allocations)
+    profiler.export('profile.csv')
+
+Phases nest (play_turn includes dungeon, add_gear and log), so
+shares don't add up to 100%. With track_allocations, tracemalloc
+measures the net bytes allocated inside each phase, at a large cost in
+speed; tracemalloc sees the whole process, so allocations made by other
+threads during a phase are counted too.
+
+A profiler is enabled per thread and only counts calls made on the
+threads it is enabled on, so app sessions profiling at the same time
+each see their own runs, and a background run enables its session's
+profiler on its own thread. A thread has at most one profiler; enabling
+it again nests, and it stays on until disable() has been called as many
+times as enable(). The wrappers stay in place while any thread is
+profiled, so unprofiled threads pay one dictionary lookup per call then.
+"""
+import functools
+import importlib
+import threading
+import time
+import tracemalloc
+
+# Phase -> the (module, attribute path) of the functions that make it up
+PHASES = {
+    'run': [('classes', 'Game.run')],
+    'play_round': [('classes', 'Game.play_round')],
+    'schedule': [('classes', 'Player.should_play_today'), ('classes', 'Player.should_play_round'),
+                 ('scheduler', 'day_plan')],
+    'periodic_resources': [('classes', 'Player.add_periodic_resources')],
+    'play_turn': [('classes', 'Game.play_turn')],
+    'dungeon': [('classes', 'Player.attempt_dungeon')],
+    'win_roll': [('classes', 'Dungeon.attempt')],
+    'contract': [('classes', 'Contract.complete')],
+    'lootbox': [('classes', 'Player.purchase_lootboxes')],
+    'add_gear': [('classes', 'Player.add_gear'), ('classes', 'Player.equip_counts')],
+    'record_stats': [('recorder', 'TimeSeriesRecorder.record'), ('recorder', 'TimeSeriesRecorder.record_repeat')],
+    'log': [('classes', 'Game.log'), ('classes', 'Game.log_action')],
+    'log_render': [('events', 'EventLog.message')],
+    'plot_stats': [('classes', 'Game.plot_stats')],
+    'render_charts': [('charts', 'render_charts')],
+    'cohort_schedule': [('engine', 'CohortEngine._players_this_round')],
+    'cohort_play_turns': [('engine', 'CohortEngine._play_turns')],
+    'cohort_record_stats': [('engine', 'CohortEngine.record_stats')],
+}
+
+# Phases that don't happen inside Game.run, so have no share of it
+OUTSIDE_RUN = {'log_render', 'plot_stats', 'render_charts', 'cohort_schedule', 'cohort_play_turns',
+               'cohort_record_stats'}
+
+# Thread ident -> [profiler, enable depth] of every thread being profiled
+_threads = {}
+_originals = []
+_lock = threading.Lock()  # Enabling and disabling can come from several threads
+
+
+class PhaseStats:
+    __slots__ = ('calls', 'total_ns', 'allocated')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.allocated = 0
+
+
+class Profiler:
+    """Calls, time and (optionally) allocations per phase, accumulated over enabled periods."""
+    def __init__(self, phases=None, track_allocations=False):
+        self.phases = PHASES if phases is None else {name: PHASES[name] for name in phases}
+        self.track_allocations = track_allocations
+        self.stats = {name: PhaseStats() for name in self.phases}
+        self._started_tracemalloc = False
+
+    @property
+    def enabled(self):
+        """Whether this profiler is enabled on the calling thread."""
+        entry = _threads.get(threading.get_ident())
+        return entry is not None and entry[0] is self
+
+    @property
+    def active(self):
+        """Whether this profiler is enabled on any thread."""
+        return any(profiler is self for profiler, _ in list(_threads.values()))
+
+    def enable(self):
+        """Profile the calling thread (nests if this profiler already does)."""
+        with _lock:
+            entry = _threads.get(threading.get_ident())
+            if entry is not None:
+                if entry[0] is not self:
+                    raise RuntimeError("This thread is already profiled by another profiler")
+                entry[1] += 1
+                return
+            if self.track_allocations and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            if not _threads:
+                _patch()
+            _threads[threading.get_ident()] = [self, 1]
+
+    def disable(self):
+        """Undo one enable() on the calling thread."""
+        with _lock:
+            ident = threading.get_ident()
+            entry = _threads.get(ident)
+            if entry is None or entry[0] is not self:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del _threads[ident]
+            if not _threads:
+                _unpatch()
+            if self._started_tracemalloc and not self.active:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def reset(self):
+        for stats in self.stats.values():
+            stats.calls = stats.total_ns = stats.allocated = 0
+
+    def table(self):
+        """One row per phase that was called: calls, total/mean time, share of Game.run, allocations."""
+        import pandas as pd
+
+        reference = self.stats['run'].total_ns if 'run' in self.stats else 0
+        rows = []
+        for name, stats in self.stats.items():
+            if not stats.calls:
+                continue
+            row = {
+                'phase': name,
+                'calls': stats.calls,
+                'total_s': stats.total_ns / 1e9,
+                'mean_us': stats.total_ns / stats.calls / 1e3,
+                'share_pct': stats.total_ns / reference * 100 if reference and name not in OUTSIDE_RUN else None,
+            }
+            if self.track_allocations:
+                row['allocated_kib'] = stats.allocated / 1024
+            rows.append(row)
+        return pd.DataFrame(rows, columns=['phase', 'calls', 'total_s', 'mean_us', 'share_pct']
+                            + (['allocated_kib'] if self.track_allocations else []))
+
+    def export(self, path):
+        """Write the table as CSV, or as JSON records when path ends in .json."""
+        table = self.table()
+        if path.endswith('.json'):
+            table.to_json(path, orient='records', indent=2)
+        else:
+            table.to_csv(path, index=False)
+
+
+def _resolve(module_name, path):
+    """(owner, attribute) for a 'Class.method' or 'function' path in a module."""
+    owner = importlib.import_module(module_name)
+    *parents, attribute = path.split('.')
+    for parent in parents:
+        owner = getattr(owner, parent)
+    return owner, attribute
+
+
+def _patch():
+    """Swap every phase's functions for wrappers that time the calls of profiled threads."""
+    for name, targets in PHASES.items():
+        for module_name, path in targets:
+            owner, attribute = _resolve(module_name, path)
+            original = owner.__dict__[attribute]
+            _originals.append((owner, attribute, original))
+            setattr(owner, attribute, _wrap(name, original))
+
+
+def _unpatch():
+    for owner, attribute, original in reversed(_originals):
+        setattr(owner, attribute, original)
+    _originals.clear()
+
+
+def _wrap(name, func):
+    clock = time.perf_counter_ns
+    traced = tracemalloc.get_traced_memory
+    get_ident = threading.get_ident
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        entry = _threads.get(get_ident())
+        stats = entry[0].stats.get(name) if entry is not None else None
+        if stats is None:  # Not a profiled thread, or a phase this profiler leaves out
+            return func(*args, **kwargs)
+        allocations = entry[0].track_allocations
+        before = traced()[0] if allocations else 0
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.total_ns += clock() - start
+            if allocations:
+                stats.allocated += traced()[0] - before
+            stats.calls += 1
+    return timed
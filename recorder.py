@@ -0,0 +1,120 @@
+"""Preallocated, columnar time-series storage for per-player stats.
+
+A TimeSeriesRecorder holds one typed NumPy column per stat and writes each
+sample into the next free slot. Game reserves room for the whole run up
+front (rounds_per_day x days, divided by the sampling interval), so
+recording never allocates per round; if a run is extended past the
+reserved horizon the columns grow by doubling.
+"""
+import numpy as np
+
+MATERIALS = ['legendary', 'epic', 'rare', 'uncommon', 'common']
+TIERS = [1, 2, 3]
+
+
+def sample_count(first_turn, last_turn, rounds_per_day, record_every):
+    """How many samples a Game records over turns first_turn..last_turn (inclusive)."""
+    if last_turn < first_turn:
+        return 0
+    interval = rounds_per_day if record_every == 'day' else record_every
+    # A turn t is recorded when (t + offset) % interval == 0
+    offset = 1 if record_every == 'day' else 0
+    return (last_turn + offset) // interval - (first_turn + offset - 1) // interval
+
+
+def recorded_turns(first_turn, stop_turn, rounds_per_day, record_every):
+    """Turns in first_turn..stop_turn - 1 that the Game records stats on."""
+    interval = rounds_per_day if record_every == 'day' else record_every
+    offset = 1 if record_every == 'day' else 0
+    first = -(-(first_turn + offset) // interval) * interval - offset  # Smallest recorded turn >= first_turn
+    return np.arange(first, stop_turn, interval)
+
+
+def should_record(turn, rounds_per_day, record_every):
+    """Whether the Game records stats on this turn (0-based)."""
+    if record_every == 'day':
+        return (turn + 1) % rounds_per_day == 0
+    return turn % record_every == 0
+
+
+class TimeSeriesRecorder:
+    """Typed columns for turn, gear level, materials, completions and win rates."""
+    def __init__(self, capacity=0):
+        self.size = 0
+        self.turns = np.zeros(capacity, dtype=np.int32)
+        self.gear_levels = np.zeros(capacity, dtype=np.int16)
+        self.materials = np.zeros((capacity, len(MATERIALS)), dtype=np.int32)
+        self.completions = np.zeros(capacity, dtype=np.int32)
+        self.win_rates = np.zeros((capacity, len(TIERS)), dtype=np.float32)
+
+    @property
+    def capacity(self):
+        return len(self.turns)
+
+    def reserve(self, extra):
+        """Make sure there is room for extra more samples."""
+        needed = self.size + extra
+        if needed > self.capacity:
+            self._resize(needed)
+
+    def _resize(self, capacity):
+        for name in ('turns', 'gear_levels', 'materials', 'completions', 'win_rates'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def record(self, turn, gear_level, materials, completions, attempts_by_tier, completions_by_tier):
+        """Write one sample; materials and the tier dicts are read, not stored."""
+        i = self.size
+        if i == self.capacity:
+            self._resize(max(16, 2 * i))
+        self.turns[i] = turn
+        self.gear_levels[i] = gear_level
+        row = self.materials[i]
+        for j, material in enumerate(MATERIALS):
+            row[j] = materials[material]
+        self.completions[i] = completions
+        row = self.win_rates[i]
+        for j, tier in enumerate(TIERS):
+            attempts = attempts_by_tier[tier]
+            row[j] = completions_by_tier[tier] / attempts * 100 if attempts > 0 else 0
+        self.size = i + 1
+
+    def record_repeat(self, turns, gear_level, materials, completions, attempts_by_tier, completions_by_tier):
+        """Write one sample per turn in turns, all with the same stats."""
+        k = len(turns)
+        if not k:
+            return
+        i = self.size
+        if i + k > self.capacity:
+            self._resize(max(16, 2 * i, i + k))
+        self.turns[i:i + k] = turns
+        self.gear_levels[i:i + k] = gear_level
+        self.materials[i:i + k] = [materials[material] for material in MATERIALS]
+        self.completions[i:i + k] = completions
+        self.win_rates[i:i + k] = [completions_by_tier[tier] / attempts_by_tier[tier] * 100
+                                   if attempts_by_tier[tier] > 0 else 0 for tier in TIERS]
+        self.size = i + k
+
+    def column(self, name):
+        """Recorded part of a column (a view, not a copy)."""
+        return getattr(self, name)[:self.size]
+
+    def material_series(self, material):
+        return self.materials[:self.size, MATERIALS.index(material)]
+
+    def win_rate_series(self, tier):
+        return self.win_rates[:self.size, TIERS.index(tier)]
+
+    def __getstate__(self):
+        # Only the recorded samples are saved; run() reserves room again on resume
+        state = {name: getattr(self, name)[:self.size].copy()
+                 for name in ('turns', 'gear_levels', 'materials', 'completions', 'win_rates')}
+        state['size'] = self.size
+        return state
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes
+                   for name in ('turns', 'gear_levels', 'materials', 'completions', 'win_rates'))
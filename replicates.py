@@ -0,0 +1,187 @@
+"""Replicate a scenario until its metrics are known precisely enough.
+
+One run is one sample. run_replicates keeps launching seeded replicates
+of a scenario and folds each result into streaming accumulators (see
+stats.RunningStats) until the confidence interval of every tracked metric
+is narrow enough, or until the time budget or the replicate limit is
+reached. Only the accumulators are kept, so memory does not grow with the
+number of replicates.
+
+An interval is narrow enough when its half-width is at most
+relative * |mean|, or at most the metric's entry in absolute when one is
+given. Replicate seeds come from one root seed and results are folded in
+replicate order, so a run with the same settings stops at the same
+replicate whatever the number of workers (unless the time budget ends it).
+
+The time budget is checked whenever a replicate finishes and, with
+several workers, when it runs out while they are busy. Jobs still running
+then are abandoned rather than waited for, but a job cannot be
+interrupted: their workers finish them in the background, and the
+interpreter waits for those at exit. With one worker the budget can be
+overrun by up to one replicate.
+
+Usage:
+    python -m replicates scenario.json [--relative 0.01] [--time-budget 60] [--workers 8]
+    python -m replicates scenario.json --metric mean_gear_level --absolute mean_gear_level=0.05
+"""
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from simulate import load_scenario
+from stats import RunningStats
+from sweep import run_job
+
+METRICS = ('mean_gear_level', 'tier_1_completion_rate', 'tier_2_completion_rate', 'tier_3_completion_rate',
+           'mean_lootboxes')
+
+
+class ReplicateResult:
+    """Accumulated statistics of a finished run_replicates call."""
+    def __init__(self, stats, targets, confidence, elapsed, reason):
+        self.stats = stats
+        self.targets = targets
+        self.confidence = confidence
+        self.elapsed = elapsed
+        self.reason = reason  # 'converged', 'time' or 'limit'
+
+    @property
+    def replicates(self):
+        return next(iter(self.stats.values())).n
+
+    def table(self):
+        """One row per metric: mean, std, interval and the half-width that was aimed for."""
+        import pandas as pd
+
+        rows = []
+        for metric, stats in self.stats.items():
+            low, high = stats.interval(self.confidence)
+            rows.append({
+                'metric': metric, 'mean': stats.mean, 'std': stats.std, 'ci_low': low, 'ci_high': high,
+                'half_width': stats.half_width(self.confidence), 'target': self.targets[metric](stats.mean)
+            })
+        return pd.DataFrame(rows)
+
+
+def _target(metric, relative, absolute):
+    if absolute and metric in absolute:
+        return lambda mean: absolute[metric]
+    return lambda mean: relative * abs(mean)
+
+
+def converged(stats, targets, confidence, min_replicates):
+    """True when every metric's interval is within its target half-width."""
+    return all(s.n >= min_replicates and s.half_width(confidence) <= targets[metric](s.mean)
+               for metric, s in stats.items())
+
+
+def run_replicates(scenario, metrics=METRICS, relative=0.02, absolute=None, confidence=0.95, time_budget=None,
+                   min_replicates=5, max_replicates=1000, seed=0, engine='game', workers=None, progress=None):
+    """Run replicates of a scenario until the metric intervals meet their targets.
+
+    workers defaults to all cores; with 1 everything runs in this process.
+    progress, if given, is called with (replicates, stats) after each
+    replicate is folded in. Returns a ReplicateResult.
+    """
+    stats = {metric: RunningStats() for metric in metrics}
+    targets = {metric: _target(metric, relative, absolute) for metric in metrics}
+    # Replicate r always gets child r, however many jobs are in flight
+    seeds = np.random.SeedSequence(seed).spawn(max_replicates)
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget else None
+
+    def job(replicate):
+        return 0, replicate, int(seeds[replicate].generate_state(1, dtype=np.uint64)[0]), scenario
+
+    def fold(row):
+        for metric, s in stats.items():
+            s.push(row[metric])
+        if progress:
+            progress(row['replicate'] + 1, stats)
+
+    def stop_reason(replicates):
+        if converged(stats, targets, confidence, min_replicates):
+            return 'converged'
+        if deadline is not None and time.perf_counter() >= deadline:
+            return 'time'
+        if replicates >= max_replicates:
+            return 'limit'
+        return None
+
+    reason = None
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        replicates = 0
+        while reason is None:
+            fold(run_job(job(replicates), engine))
+            replicates += 1
+            reason = stop_reason(replicates)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            running = {}
+            done = {}  # Finished ahead of an earlier replicate, folded once it is in
+            launched = folded = 0
+            while reason is None:
+                while len(running) < workers and launched < max_replicates:
+                    running[pool.submit(run_job, job(launched), engine)] = launched
+                    launched += 1
+                timeout = max(deadline - time.perf_counter(), 0.0) if deadline is not None else None
+                finished, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not finished:
+                    reason = 'time'
+                for future in finished:
+                    done[running.pop(future)] = future.result()
+                while folded in done and reason is None:
+                    fold(done.pop(folded))
+                    folded += 1
+                    reason = stop_reason(folded)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    return ReplicateResult(stats, targets, confidence, time.perf_counter() - start, reason)
+
+
+def parse_absolute(text):
+    metric, sep, value = text.partition('=')
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected metric=half_width, got {text!r}")
+    return metric, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replicate a scenario until its metrics are precise enough.")
+    parser.add_argument('scenario', help="Scenario JSON file")
+    parser.add_argument('--metric', dest='metrics', action='append', default=None,
+                        help=f"Metric to track (repeatable, default: {', '.join(METRICS)})")
+    parser.add_argument('--relative', type=float, default=0.02,
+                        help="Target half-width as a fraction of the mean (default 0.02)")
+    parser.add_argument('--absolute', action='append', default=[], type=parse_absolute, metavar='METRIC=WIDTH',
+                        help="Absolute target half-width for one metric (repeatable)")
+    parser.add_argument('--confidence', type=float, default=0.95, help="Confidence level of the intervals")
+    parser.add_argument('--time-budget', type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument('--min-replicates', type=int, default=5)
+    parser.add_argument('--max-replicates', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0, help="Root seed for the replicate seeds")
+    parser.add_argument('--engine', choices=['game', 'cohort'], default='game')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('-o', '--out', default=None, help="Optional results CSV")
+    args = parser.parse_args(argv)
+
+    result = run_replicates(load_scenario(args.scenario), metrics=args.metrics or METRICS, relative=args.relative,
+                            absolute=dict(args.absolute), confidence=args.confidence,
+                            time_budget=args.time_budget, min_replicates=args.min_replicates,
+                            max_replicates=args.max_replicates, seed=args.seed, engine=args.engine,
+                            workers=args.workers)
+    table = result.table()
+    if args.out:
+        table.to_csv(args.out, index=False)
+    print(f"{result.replicates} replicates in {result.elapsed:.1f}s ({result.reason}), "
+          f"{result.confidence:.0%} intervals")
+    print(table.to_string(index=False, float_format=lambda value: f"{value:.4g}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Precompiled samplers for drop tables and tier choice.
+
+A DropTable is compiled once from a chance dict (cumulative sums in the
+dict's order) and then maps a uniform roll to an outcome with a binary
+search instead of re-walking the dict. The mapping is the same as the
+original roll_* loops: a roll lands on the first outcome whose cumulative
+chance exceeds it, and on the default outcome if it lands past the total.
+
+The uniforms themselves come from the per-player streams in streams.py.
+"""
+import bisect
+import functools
+import itertools
+from collections.abc import Mapping
+
+import numpy as np
+
+# Distinct chance tables kept compiled; sweeps and a long-running app see many, so the oldest are dropped
+TABLE_CACHE_SIZE = 256
+
+
+class DropTable(Mapping):
+    """Immutable outcome -> chance table with O(log k) single and vectorized batch draws."""
+    def __init__(self, chances, default):
+        self.outcomes = tuple(chances)
+        self.chances = tuple(chances.values())
+        self.cumulative = tuple(itertools.accumulate(self.chances))
+        self.default = default
+        # Outcome returned for each possible bisect position, default last
+        self._choices = self.outcomes + (default,)
+        self._cumulative_array = np.array(self.cumulative)
+
+    @classmethod
+    def compile(cls, chances, default):
+        """Return the cached table for a chance dict, compiling it on first use."""
+        if isinstance(chances, DropTable) and chances.default == default:
+            return chances
+        return _compiled(cls, tuple(chances.items()), default)
+
+    def __getitem__(self, outcome):
+        return self.chances[self.outcomes.index(outcome)]
+
+    def __iter__(self):
+        return iter(self.outcomes)
+
+    def __len__(self):
+        return len(self.outcomes)
+
+    def __hash__(self):
+        return hash((self.outcomes, self.chances, self.default))
+
+    def __eq__(self, other):
+        if isinstance(other, DropTable):
+            return (self.outcomes, self.chances, self.default) == (other.outcomes, other.chances, other.default)
+        return Mapping.__eq__(self, other)
+
+    def __repr__(self):
+        return f"DropTable({dict(zip(self.outcomes, self.chances))!r}, default={self.default!r})"
+
+    def draw(self, u):
+        """Map one uniform roll to an outcome."""
+        return self._choices[bisect.bisect_right(self.cumulative, u)]
+
+    def draw_indices(self, u):
+        """Map an array of rolls to positions in outcomes (len(outcomes) means default)."""
+        return np.searchsorted(self._cumulative_array, u, side='right')
+
+    def draw_many(self, u):
+        """Map an array of rolls to a list of outcomes."""
+        return [self._choices[i] for i in self.draw_indices(u).tolist()]
+
+    def draw_counts(self, u):
+        """Count how many of the rolls land on each outcome."""
+        counts = np.bincount(self.draw_indices(u), minlength=len(self._choices))
+        totals = {}
+        for outcome, count in zip(self._choices, counts.tolist()):
+            if count:
+                totals[outcome] = totals.get(outcome, 0) + count
+        return totals
+
+
+@functools.lru_cache(maxsize=TABLE_CACHE_SIZE)
+def _compiled(cls, items, default):
+    return cls(dict(items), default)
+
+
+class TierChooser:
+    """Dungeon tier sampler for Game.choose_dungeon_tier.
+
+    The tier weights depend on the player's gear bonus, which only takes a
+    handful of distinct values, so one normalized DropTable is compiled
+    per bonus value and reused.
+    """
+    base_weights = {1: 10, 2: 5, 3: 1}
+
+    def __init__(self, dungeon_choice_probabilities):
+        self.gear_modifiers = {
+            1: dungeon_choice_probabilities['tier_1']['gear_modifier'],
+            2: dungeon_choice_probabilities['tier_2']['gear_modifier'],
+            3: dungeon_choice_probabilities['tier_3']['gear_modifier']
+        }
+        self._tables = {}
+
+    def table(self, gear_level):
+        """Return the compiled tier table for a gear bonus."""
+        table = self._tables.get(gear_level)
+        if table is None:
+            # Tier 1 keeps its base weight; higher tiers scale with gear
+            weights = {
+                1: self.base_weights[1],
+                2: self.base_weights[2] + (self.gear_modifiers[2] * gear_level),
+                3: self.base_weights[3] + (self.gear_modifiers[3] * gear_level)
+            }
+            total = sum(weights.values())
+            if total == 0:
+                weights, total = {1: 1}, 1
+            table = self._tables[gear_level] = DropTable(
+                {tier: weight / total for tier, weight in weights.items()}, 1)
+        return table
+
+    def choose(self, gear_level, u):
+        return self.table(gear_level).draw(u)
+
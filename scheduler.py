@@ -0,0 +1,132 @@
+"""Event-driven game loop that skips idle rounds.
+
+Game.play_round visits every player every round, but a player's schedule
+is fixed by play_frequency and activity_level: a player who plays one day
+in five only has something to do on that day. run_events keeps a heap of
+upcoming events and jumps straight from one to the next:
+
+    plan    at the start of a day the player plays, work out which rounds
+            they take a turn in (advancing last_play_day and rounds_played
+            exactly as the round loop does over that day)
+    turn    a player takes a turn
+    tick    periodic resources are logged (only when the log keeps them)
+
+Everything that happens to a player between their turns is applied when
+they next act, or when the run stops: periodic resources from the ticks
+they missed, and recorder samples, which repeat their unchanged stats.
+The cost of a run is then proportional to the turns actually taken.
+
+The result (players, random streams, action log, recorded series and
+checkpoints) is identical to the round loop. Skipped rounds and idle
+days are DEBUG events, so Game.run uses the round loop at DEBUG level.
+"""
+import heapq
+
+import checkpoint
+import events
+from recorder import recorded_turns
+
+PERIODIC_INTERVAL = 6  # Rounds between periodic resources
+
+# Event kinds, in the order they run within a round
+TICK, PLAN, TURN = 0, 1, 2
+
+
+def next_play_day(player, day):
+    """First day from day on which player.should_play_today would return True."""
+    if day == 1:
+        return 1
+    return max(day, player.last_play_day + player.play_frequency)
+
+
+def day_plan(player, day, rounds_per_day):
+    """Rounds of day in which player takes a turn, as the round loop would decide them."""
+    return [current_round for current_round in range(1, rounds_per_day + 1)
+            if player.should_play_today(day) and player.should_play_round()]
+
+
+class _Catchup:
+    """What a player is owed: ticks after turn ticked, recorder samples from turn recorded on."""
+    __slots__ = ('ticked', 'recorded')
+
+    def __init__(self, turn):
+        self.ticked = turn - 1
+        self.recorded = turn
+
+
+def run_events(game, days, checkpoint_every=None, checkpoint_path=None):
+    """Play game up to the end of day days; a drop-in for the loop in Game.run.
+
+    The game must be at the start of a day.
+    """
+    R = game.rounds_per_day
+    start, end = game.total_turns, days * R
+    players = game.players
+    catchup = [_Catchup(start) for _ in players]
+
+    def sync(player, ticked, turn):
+        """Pay player the ticks through turn ticked and the samples before turn."""
+        owed = catchup[player.index]
+        ticks = ticked // PERIODIC_INTERVAL - max(owed.ticked, 0) // PERIODIC_INTERVAL
+        if ticks > 0:
+            player.yoku += ticks
+            player.pioneer_points += 2 * ticks
+        owed.ticked = ticked
+        if turn > owed.recorded:
+            player.recorder.record_repeat(recorded_turns(owed.recorded, turn, R, game.record_every),
+                                          player.gear_level, player.materials, player.total_completions,
+                                          player.dungeon_attempts, player.dungeon_completions)
+            owed.recorded = turn
+
+    def stop_at(turn):
+        """Sync everyone to a day boundary and set the game's counters there."""
+        for player in players:
+            sync(player, turn - 1, turn)
+        game.total_turns = turn
+        game.current_day, game.current_round = turn // R + 1, 1
+
+    heap = []
+    for player in players:
+        day = next_play_day(player, game.current_day)
+        if day <= days:
+            heap.append(((day - 1) * R, PLAN, player.index, day))
+    if game.log_level >= events.PERIODIC_RESOURCES.level:
+        first_tick = max(-(-start // PERIODIC_INTERVAL), 1) * PERIODIC_INTERVAL
+        if first_tick < end:
+            heap.append((first_tick, TICK, -1, 0))
+    heapq.heapify(heap)
+
+    checkpoints = []
+    if checkpoint_every:
+        checkpoints = [day * R for day in range(start // R + 1, days + 1) if day % checkpoint_every == 0]
+        checkpoints.reverse()
+
+    while heap:
+        turn, kind, index, day = heapq.heappop(heap)
+        while checkpoints and checkpoints[-1] <= turn:
+            stop_at(checkpoints.pop())
+            checkpoint.save(game, checkpoint_path)
+        game.current_day, game.current_round = turn // R + 1, turn % R + 1
+        if kind == TURN:
+            player = players[index]
+            # The round's tick comes before its turns
+            sync(player, turn, turn)
+            game.play_turn(player)
+        elif kind == PLAN:
+            player = players[index]
+            for current_round in day_plan(player, day, R):
+                heapq.heappush(heap, ((day - 1) * R + current_round - 1, TURN, index, day))
+            day = next_play_day(player, day + 1)
+            if day <= days:
+                heapq.heappush(heap, ((day - 1) * R, PLAN, index, day))
+        else:
+            for player in players:
+                game.log(events.PERIODIC_RESOURCES, player)
+            if turn + PERIODIC_INTERVAL < end:
+                heapq.heappush(heap, (turn + PERIODIC_INTERVAL, TICK, -1, 0))
+
+    # Checkpoints after every player's last event of the run
+    while checkpoints:
+        stop_at(checkpoints.pop())
+        checkpoint.save(game, checkpoint_path)
+    stop_at(end)
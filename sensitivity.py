@@ -0,0 +1,203 @@
+"""One-at-a-time sensitivity analysis around a scenario.
+
+Every tunable rule parameter (the drop chances, completion rates, gear
+bonuses and tier gear modifiers of the sidebar) is moved down and up by
+a relative step around its current value while everything else stays
+put. All the perturbed configurations and the base one go into a single
+batch of sweep jobs that runs across a process pool, and replicate r of
+every configuration uses the same seed, so each perturbation is compared
+with the base under common random numbers (see compare.py).
+
+For each parameter and metric the table reports the metric at the low
+and high value, the slope (change in metric per unit of parameter) with
+a confidence interval over replicates, and the elasticity: the percent
+change in the metric per percent change in the parameter. Parameters
+at 0 are skipped unless zero_step is given; they can only move up, by
+that absolute step, and have no elasticity. Drop chances are weights (Config normalizes each table), so
+raising one also lowers the others' share.
+
+The tier choice probabilities of the sidebar are not read by the game
+(tier choice depends on gear via the gear modifiers), so they are left
+out.
+
+Usage:
+    python -m sensitivity scenario.json -o sensitivity.csv [--step 0.1] [--replicates 4] [--workers 8]
+    python -m sensitivity scenario.json --parameter gear_bonus_values --metric mean_gear_level
+"""
+import argparse
+import copy
+
+import numpy as np
+
+from config import Config
+from simulate import load_scenario
+from stats import half_width
+from sweep import run_jobs
+
+METRICS = ('mean_gear_level', 'mean_completions', 'mean_lootboxes', 'tier_1_completion_rate',
+           'tier_2_completion_rate', 'tier_3_completion_rate')
+
+# Parameters that are not probabilities, so have no upper bound of 1
+UNBOUNDED = ('gear_modifier',)
+
+
+def parameters(scenario):
+    """Dotted path -> current value of every tunable parameter of a scenario (defaults filled in)."""
+    config = Config()
+    config.update_from_user_input(scenario)
+    found = {}
+    for table in ('contract_material_drop_chances', 'lootbox_loot_drop_chances', 'gear_bonus_values'):
+        for rarity, value in getattr(config, table).items():
+            found[f"{table}.{rarity}"] = value
+    found['lootbox_pet_drop_chance'] = config.lootbox_pet_drop_chance
+    for table in ('dungeon_win_probabilities', 'dungeon_pet_drop_chances'):
+        for tier, value in getattr(config, table).items():
+            found[f"{table}.{tier}"] = value
+    for table in ('dungeon_material_drop_chances', 'dungeon_loot_drop_chances'):
+        for tier, chances in getattr(config, table).items():
+            for rarity, value in chances.items():
+                found[f"{table}.{tier}.{rarity}"] = value
+    for tier, choice in config.dungeon_choice_probabilities.items():
+        found[f"dungeon_choice.{tier}.gear_modifier"] = choice['gear_modifier']
+    return found
+
+
+def set_parameter(scenario, path, value):
+    """sweep.set_path that also finds tier keys stored as integers (as app.user_input() does)."""
+    keys = path.split('.')
+    node = scenario
+    for depth, key in enumerate(keys):
+        if key not in node and key.isdigit() and int(key) in node:
+            key = int(key)
+        if depth == len(keys) - 1:
+            node[key] = value
+        else:
+            node = node.setdefault(key, {})
+
+
+def bounds(path, value, step, zero_step):
+    """(low, high) values of a parameter for a relative step, kept in range."""
+    if value == 0:
+        return 0.0, zero_step
+    low, high = max(value * (1 - step), 0.0), value * (1 + step)
+    if path.rsplit('.', 1)[-1] not in UNBOUNDED:
+        high = min(high, 1.0)
+    return low, high
+
+
+def make_jobs(base, points, replicates, seed=0):
+    """sweep jobs for the base (config_id 0) and each low/high point (2i + 1, 2i + 2).
+
+    Every configuration shares the replicate seeds.
+    """
+    children = np.random.SeedSequence(seed).spawn(replicates)
+    scenarios = [base]
+    for path, low, high in points:
+        for value in (low, high):
+            scenario = copy.deepcopy(base)
+            set_parameter(scenario, path, value)
+            scenarios.append(scenario)
+    jobs = []
+    for replicate, child in enumerate(children):
+        job_seed = int(child.generate_state(1, dtype=np.uint64)[0])
+        for config_id, scenario in enumerate(scenarios):
+            jobs.append((config_id, replicate, job_seed, scenario))
+    return jobs
+
+
+def sensitivity_table(points, values, rows, metrics=METRICS, confidence=0.95):
+    """One row per (parameter, metric): metric at low/base/high, slope with its interval, elasticity."""
+    import pandas as pd
+
+    results = pd.DataFrame(rows).set_index(['config_id', 'replicate'])
+    base = results.loc[0]
+    table = []
+    for i, (path, low, high) in enumerate(points):
+        below, above = results.loc[2 * i + 1], results.loc[2 * i + 2]
+        for metric in metrics:
+            # Paired per replicate: the shared seed cancels most of the noise
+            slopes = (above[metric] - below[metric]) / (high - low)
+            slope = float(slopes.mean())
+            h = half_width(float(slopes.std()), len(slopes), confidence)
+            base_mean = float(base[metric].mean())
+            table.append({
+                'parameter': path,
+                'metric': metric,
+                'value': values[path],
+                'low': low,
+                'high': high,
+                'metric_low': float(below[metric].mean()),
+                'metric_base': base_mean,
+                'metric_high': float(above[metric].mean()),
+                'slope': slope,
+                'slope_ci_low': slope - h,
+                'slope_ci_high': slope + h,
+                'elasticity': slope * values[path] / base_mean if values[path] and base_mean else np.nan,
+            })
+    frame = pd.DataFrame(table)
+    frame.attrs['replicates'] = len(base)
+    return frame
+
+
+def run_sensitivity(scenario, step=0.1, zero_step=None, replicates=4, seed=0, metrics=METRICS, only=None,
+                    engine='game', workers=None, confidence=0.95):
+    """Perturb every parameter (or those whose path starts with one of only) and tabulate the effects.
+
+    Returns (table, raw rows); runs 1 + 2 * parameters configurations x replicates.
+    """
+    values = parameters(scenario)
+    if only:
+        values = {path: value for path, value in values.items()
+                  if any(path.startswith(prefix) for prefix in only)}
+    if not zero_step:
+        values = {path: value for path, value in values.items() if value != 0}
+    points = [(path, *bounds(path, value, step, zero_step)) for path, value in values.items()]
+    jobs = make_jobs(scenario, points, replicates, seed)
+    rows = run_jobs(jobs, engine=engine, workers=workers)
+    return sensitivity_table(points, values, rows, metrics, confidence), rows
+
+
+def tornado(table, metric):
+    """Rows of one metric ordered by swing (|metric_high - metric_low|), largest first."""
+    rows = table[table['metric'] == metric].copy()
+    rows['swing'] = (rows['metric_high'] - rows['metric_low']).abs()
+    return rows.sort_values('swing', ascending=False).reset_index(drop=True)
+
+
+def elasticity_matrix(table):
+    """Parameters x metrics grid of elasticities, parameters in the table's order."""
+    matrix = table.pivot(index='parameter', columns='metric', values='elasticity')
+    return matrix.loc[table['parameter'].unique(), table['metric'].unique()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="One-at-a-time sensitivity of outcomes to the rule parameters.")
+    parser.add_argument('scenario', help="Scenario JSON file")
+    parser.add_argument('--step', type=float, default=0.1, help="Relative perturbation (default 0.1, i.e. +/-10%%)")
+    parser.add_argument('--zero-step', type=float, default=None,
+                        help="Absolute step up for parameters that are 0 (default: skip them)")
+    parser.add_argument('--parameter', dest='only', action='append', default=None, metavar='PREFIX',
+                        help="Only perturb parameters whose path starts with PREFIX (repeatable)")
+    parser.add_argument('--metric', dest='metrics', action='append', default=None,
+                        help=f"Metric to report (repeatable, default: {', '.join(METRICS)})")
+    parser.add_argument('--replicates', type=int, default=4, help="Replicates per configuration")
+    parser.add_argument('--seed', type=int, default=0, help="Root seed for the replicate seeds")
+    parser.add_argument('--confidence', type=float, default=0.95, help="Confidence level of the slope intervals")
+    parser.add_argument('--engine', choices=['game', 'cohort'], default='game')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('-o', '--out', default=None, help="Optional results CSV")
+    args = parser.parse_args(argv)
+
+    metrics = args.metrics or METRICS
+    table, _ = run_sensitivity(load_scenario(args.scenario), step=args.step, zero_step=args.zero_step,
+                               replicates=args.replicates, seed=args.seed, metrics=metrics, only=args.only,
+                               engine=args.engine, workers=args.workers, confidence=args.confidence)
+    if args.out:
+        table.to_csv(args.out, index=False)
+    print(f"{table['parameter'].nunique()} parameters, {table.attrs['replicates']} replicates each, "
+          f"+/-{args.step:.0%}")
+    print(elasticity_matrix(table).to_string(float_format=lambda value: f"{value:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
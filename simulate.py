@@ -0,0 +1,376 @@
+"""Headless simulation runner.
+
+Runs a Game from a scenario file without importing Streamlit or any
+plotting library, and writes the results to disk.
+
+A scenario is a JSON file holding the same settings the app collects in
+user_input(), plus the player list from player_input():
+
+    {
+        "simulation_settings": {"rounds_per_day": 10, "simulation_days": 30},
+        "gear_bonus_values": {"legendary": 0.05, "epic": 0.03, ...},
+        "dungeon_win_probabilities": {"1": 0.8, "2": 0.6, "3": 0.3},
+        ...
+        "players": [
+            {"name": "Player 1", "activity_level": 1.0, "play_frequency": 1}
+        ]
+    }
+
+Any setting that is left out keeps its Config default.
+
+Usage:
+    python -m simulate scenario.json [more.json ...] -o results/
+    python -m simulate scenario.json --engine cohort -o results/
+    python -m simulate scenario.json --player 17 --log --log-level debug
+    python -m simulate scenario.json --checkpoint-every 10 -o results/
+    python -m simulate scenario.json --profile -o results/
+    python -m simulate scenario.json --log --trace-memory -o results/
+
+Runs are seeded (simulation_settings.seed, or --seed); an unseeded run
+picks a seed and records it in summary.json. Every player draws from
+their own streams, so --player re-runs just the listed players and
+reproduces exactly what they did in the full run.
+
+Setting simulation_settings.antithetic to true mirrors every random draw
+(u becomes 1 - u); compare.py pairs such runs with regular ones.
+
+With --checkpoint-every, the game state is saved to checkpoint.bin in the
+scenario's output directory every N days. Running the same command again
+resumes from that checkpoint instead of starting over.
+
+With --profile, time spent in each phase of the run (see profiling.py)
+is written to profile.csv next to the results.
+
+Every run writes memory.json: the bytes held by the action log,
+recorders, players and streams at the end of the run, plus the peak
+traced during it with --trace-memory.
+Setting simulation_settings.memory_budget_mb bounds the first two (see
+memory.py); with --log, log records that don't fit in memory are spilled
+to action_log.spill and still end up in action_log.txt.
+
+The cohort engine (engine.CohortEngine) runs the same rules on NumPy
+arrays and writes cohort-level history.csv, players.csv and a per-archetype
+population.csv instead of per-turn series. For large player bases, give a
+"population" (see population.py) instead of a "players" list.
+"""
+import argparse
+import contextlib
+import csv
+import functools
+import json
+import os
+import sys
+
+import checkpoint
+import memory
+from config import Config
+from classes import Player, Game
+from events import LOG_LEVELS, OFF
+from profiling import Profiler
+
+MATERIALS = ['legendary', 'epic', 'rare', 'uncommon', 'common']
+TIERS = [1, 2, 3]
+
+
+def load_scenario(path):
+    """Read a scenario file."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_game(scenario, log_level=None, only=None, spill_path=None):
+    """Create the Config, players and Game described by a scenario.
+
+    log_level defaults to the scenario's simulation_settings.log_level.
+    only is an optional list of player positions to run on their own.
+    With simulation_settings.memory_budget_mb, the action log and stats
+    sampling are sized to the budget (see memory.py); spill_path then
+    receives the log records that don't fit.
+    """
+    config = Config()
+    config.update_from_user_input(scenario)
+    settings = scenario.get('simulation_settings', {})
+    players = [
+        Player(
+            p_config['name'],
+            config,
+            activity_level=p_config.get('activity_level', 1.0),
+            play_frequency=p_config.get('play_frequency', 1),
+            stream_id=i
+        )
+        for i, p_config in enumerate(scenario.get('players', []))
+        if only is None or i in only
+    ]
+    if log_level is None:
+        log_level = LOG_LEVELS[settings.get('log_level', 'actions')]
+    rounds_per_day = settings.get('rounds_per_day', 10)
+    record_every = settings.get('record_every', 1)
+    action_log = None
+    if settings.get('memory_budget_mb'):
+        budget = memory.plan(settings['memory_budget_mb'], len(players), settings.get('simulation_days', 10),
+                             rounds_per_day, record_every)
+        record_every = budget.record_every
+        action_log = budget.action_log([player.name for player in players], log_level, spill_path)
+    return Game(players, config, rounds_per_day=rounds_per_day, seed=settings.get('seed'), log_level=log_level,
+                record_every=record_every, antithetic=settings.get('antithetic', False), action_log=action_log)
+
+
+def run_scenario(scenario, log_level=None, only=None, spill_path=None):
+    """Build and run the game for a scenario, returning the finished Game."""
+    game = build_game(scenario, log_level, only, spill_path)
+    days = scenario.get('simulation_settings', {}).get('simulation_days', 10)
+    game.run(days=days)
+    return game
+
+
+def resume_scenario(scenario, path, log_level=None, only=None, spill_path=None):
+    """Load the checkpoint at path if it belongs to this scenario, else build a new game.
+
+    The checkpoint must match the scenario's config, players, schedule and
+    seed, and the requested log level. Returns (game, resumed).
+    """
+    game = build_game(scenario, log_level, only, spill_path)
+    if not os.path.exists(path):
+        return game, False
+    saved = checkpoint.load(path)
+    seeded = scenario.get('simulation_settings', {}).get('seed') is not None
+    same = (
+        saved.config.fingerprint == game.config.fingerprint
+        and [p.name for p in saved.players] == [p.name for p in game.players]
+        and (saved.rounds_per_day, saved.record_every) == (game.rounds_per_day, game.record_every)
+        and saved.log_level == game.log_level
+        and (saved.seed == game.seed or not seeded)
+    )
+    return (saved, True) if same else (game, False)
+
+
+def run_cohort_scenario(scenario, seed=None):
+    """Run a scenario on the vectorized CohortEngine.
+
+    seed defaults to the scenario's simulation_settings.seed.
+    """
+    from engine import CohortEngine
+    from population import sample_population
+
+    config = Config()
+    config.update_from_user_input(scenario)
+    settings = scenario.get('simulation_settings', {})
+    seed = seed if seed is not None else settings.get('seed')
+    if 'population' in scenario:
+        columns = sample_population(scenario['population'], seed)
+    else:
+        players = scenario.get('players', [])
+        columns = {
+            'archetype': None,
+            'activity_level': [p_config.get('activity_level', 1.0) for p_config in players],
+            'play_frequency': [p_config.get('play_frequency', 1) for p_config in players]
+        }
+    engine = CohortEngine(
+        config,
+        columns['activity_level'],
+        columns['play_frequency'],
+        rounds_per_day=settings.get('rounds_per_day', 10),
+        seed=seed,
+        archetypes=columns['archetype'],
+        antithetic=settings.get('antithetic', False)
+    )
+    engine.run(days=settings.get('simulation_days', 10))
+    return engine
+
+
+def write_table(path, columns):
+    """Write a dict of equal-length columns as CSV."""
+    names = list(columns)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*(columns[name] for name in names)))
+
+
+def write_cohort_results(engine, out_dir):
+    """Write history.csv, players.csv and population.csv for a finished CohortEngine."""
+    from population import summarize
+
+    os.makedirs(out_dir, exist_ok=True)
+    write_table(os.path.join(out_dir, 'history.csv'), engine.history)
+    write_table(os.path.join(out_dir, 'players.csv'),
+                {name: column.tolist() for name, column in engine.final_state().items()})
+    summarize(engine).to_csv(os.path.join(out_dir, 'population.csv'), index=False)
+
+
+def player_summary(player):
+    """Final stats for one player as a JSON-friendly dict."""
+    total_attempts = sum(player.dungeon_attempts.values())
+    total_completions = sum(player.dungeon_completions.values())
+    return {
+        'name': player.name,
+        'activity_level': player.activity_level,
+        'play_frequency': player.play_frequency,
+        'yoku': player.yoku,
+        'pioneer_points': player.pioneer_points,
+        'skull_tokens': player.skull_tokens,
+        'gear': list(player.gear),
+        'gear_level': player.gear_level,
+        'materials': dict(player.materials),
+        'pets': list(player.pets),
+        'lootboxes_opened': player.lootboxes_opened,
+        'dungeon_attempts': {str(tier): player.dungeon_attempts[tier] for tier in TIERS},
+        'dungeon_completions': {str(tier): player.dungeon_completions[tier] for tier in TIERS},
+        'completion_rate': (total_completions / total_attempts * 100) if total_attempts > 0 else 0
+    }
+
+
+def game_metrics(game):
+    """Cohort-level outcome metrics of a finished Game.
+
+    cohort_metrics computes the same keys for a CohortEngine, so results
+    from either engine can be compared and aggregated together.
+    """
+    players = game.players
+    n = len(players) or 1
+    metrics = {
+        'mean_gear_level': sum(player.gear_level for player in players) / n,
+        'mean_completions': sum(player.total_completions for player in players) / n,
+        'mean_lootboxes': sum(player.lootboxes_opened for player in players) / n,
+        'mean_pets': sum(len(player.pets) for player in players) / n,
+    }
+    for tier in TIERS:
+        attempts = sum(player.dungeon_attempts[tier] for player in players)
+        completions = sum(player.dungeon_completions[tier] for player in players)
+        metrics[f"tier_{tier}_completion_rate"] = (completions / attempts * 100) if attempts > 0 else 0
+    return metrics
+
+
+def cohort_metrics(engine):
+    """game_metrics for a finished CohortEngine."""
+    metrics = {
+        'mean_gear_level': float(engine.gear_level().mean()),
+        'mean_completions': float(engine.dungeon_completions.sum(axis=1).mean()),
+        'mean_lootboxes': float(engine.lootboxes_opened.mean()),
+        'mean_pets': float(engine.pets.mean()),
+    }
+    attempts = engine.dungeon_attempts.sum(axis=0)
+    completions = engine.dungeon_completions.sum(axis=0)
+    for i, tier in enumerate(TIERS):
+        metrics[f"tier_{tier}_completion_rate"] = float(completions[i] / attempts[i] * 100) if attempts[i] > 0 else 0
+    return metrics
+
+
+def game_summary(game):
+    """Final stats for a finished game as a JSON-friendly dict."""
+    return {
+        'seed': game.seed,
+        'days': game.current_day - 1 if game.current_round == 1 else game.current_day,
+        'rounds_per_day': game.rounds_per_day,
+        'total_turns': game.total_turns,
+        'players': [player_summary(player) for player in game.players]
+    }
+
+
+def write_results(game, out_dir, write_log=False, peak=None):
+    """Write summary.json, timeseries.csv, memory.json and optionally action_log.txt."""
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'summary.json'), 'w') as f:
+        json.dump(game_summary(game), f, indent=2)
+
+    with open(os.path.join(out_dir, 'timeseries.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ['player', 'turn', 'gear_level']
+            + [f"{material}_materials" for material in MATERIALS]
+            + ['completions']
+            + [f"tier_{tier}_win_rate" for tier in TIERS]
+        )
+        for player in game.players:
+            columns = (
+                [player.turns.tolist(), player.gear_levels_over_time.tolist()]
+                + [player.materials_over_time[material].tolist() for material in MATERIALS]
+                + [player.completions_over_time.tolist()]
+                + [player.win_rates_over_time[tier].round(4).tolist() for tier in TIERS]
+            )
+            for row in zip(*columns):
+                writer.writerow((player.name,) + row)
+
+    with open(os.path.join(out_dir, 'memory.json'), 'w') as f:
+        json.dump(memory.memory_report(game, peak), f, indent=2)
+
+    if write_log:
+        game.action_log.export(os.path.join(out_dir, 'action_log.txt'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run dungeon simulations without the Streamlit UI.")
+    parser.add_argument('scenarios', nargs='+', help="Scenario JSON files")
+    parser.add_argument('-o', '--out', default='results',
+                        help="Output directory; each scenario gets a subdirectory named after its file")
+    parser.add_argument('--log', action='store_true', help="Also write the action log")
+    parser.add_argument('--log-level', choices=list(LOG_LEVELS), default=None,
+                        help="Action log detail when --log is given (default: the scenario's, else 'actions')")
+    parser.add_argument('--engine', choices=['game', 'cohort'], default='game',
+                        help="'game' runs classes.Game, 'cohort' runs the vectorized engine")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed (overrides the scenario's)")
+    parser.add_argument('--player', type=int, action='append', default=None,
+                        help="Only run the player at this position in the scenario (repeatable)")
+    parser.add_argument('--checkpoint-every', type=int, default=None, metavar='DAYS',
+                        help="Save a checkpoint every DAYS days and resume from it on the next run")
+    parser.add_argument('--profile', action='store_true',
+                        help="Time each phase of the run and write profile.csv (see profiling.py)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Trace allocations during the run and add the peak to memory.json (slower)")
+    args = parser.parse_args(argv)
+    if args.engine == 'cohort':
+        game_only = [flag for flag, value in (('--player', args.player), ('--log', args.log),
+                                              ('--checkpoint-every', args.checkpoint_every),
+                                              ('--trace-memory', args.trace_memory)) if value]
+        if game_only:
+            parser.error(f"--engine cohort does not support {', '.join(game_only)}")
+
+    for path in args.scenarios:
+        name = os.path.splitext(os.path.basename(path))[0]
+        scenario = load_scenario(path)
+        if args.seed is not None:
+            scenario.setdefault('simulation_settings', {})['seed'] = args.seed
+        profiler = Profiler() if args.profile else None
+        with profiler or contextlib.nullcontext():
+            run_one(scenario, name, args)
+        if profiler:
+            profiler.export(os.path.join(args.out, name, 'profile.csv'))
+
+
+def run_one(scenario, name, args):
+    """Run one scenario for the command line and write its results."""
+    if args.engine == 'cohort':
+        engine = run_cohort_scenario(scenario)
+        write_cohort_results(engine, os.path.join(args.out, name))
+        print(f"{name}: {engine.num_players} players, {engine.total_turns} rounds -> {os.path.join(args.out, name)}",
+              file=sys.stderr)
+        return
+    out_dir = os.path.join(args.out, name)
+    # Without --log nothing reads the log, so don't record it at all
+    log_level = (LOG_LEVELS[args.log_level] if args.log_level else None) if args.log else OFF
+    days = scenario.get('simulation_settings', {}).get('simulation_days', 10)
+    # Under a memory budget, log records that don't fit are spilled next to the results
+    spill_path = os.path.join(out_dir, 'action_log.spill') if args.log else None
+    os.makedirs(out_dir, exist_ok=True)
+    if args.checkpoint_every:
+        path = os.path.join(out_dir, 'checkpoint.bin')
+        game, resumed = resume_scenario(scenario, path, log_level, args.player, spill_path)
+        if resumed:
+            print(f"{name}: resuming at day {game.current_day}, round {game.current_round}", file=sys.stderr)
+        run = functools.partial(game.run, days=days, checkpoint_every=args.checkpoint_every, checkpoint_path=path)
+    else:
+        game = build_game(scenario, log_level, args.player, spill_path)
+        run = functools.partial(game.run, days=days)
+    # tracemalloc slows the run down several times, so the peak is opt-in
+    peak = None
+    if args.trace_memory:
+        peak, _ = memory.traced_peak(run)
+    else:
+        run()
+    write_results(game, out_dir, write_log=args.log, peak=peak)
+    print(f"{name}: {len(game.players)} players, {game.total_turns} rounds -> {out_dir}",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Small statistics helpers for replicate results (no SciPy needed)."""
+import math
+from statistics import NormalDist
+
+
+def t_quantile(p, df):
+    """Quantile of Student's t distribution with df degrees of freedom.
+
+    Exact for df 1 and 2; above that a Cornish-Fisher expansion around the
+    normal quantile, within 0.01 of the exact value from df 3 on.
+    """
+    if not 0.0 < p < 1.0:
+        raise ValueError(f"p must be between 0 and 1, got {p}")
+    if df < 1:
+        raise ValueError(f"df must be at least 1, got {df}")
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+def half_width(std, n, confidence=0.95):
+    """Half-width of the t confidence interval for a mean of n values with sample std."""
+    if n < 2:
+        return math.inf
+    return t_quantile(0.5 + confidence / 2, n - 1) * std / math.sqrt(n)
+
+
+class RunningStats:
+    """Streaming mean and variance (Welford), constant memory in the number of values."""
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, value):
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        """Sample variance (0 until there are two values)."""
+        return self._m2 / (self.n - 1) if self.n > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def half_width(self, confidence=0.95):
+        return half_width(self.std, self.n, confidence)
+
+    def interval(self, confidence=0.95):
+        h = self.half_width(confidence)
+        return self.mean - h, self.mean + h
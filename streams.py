@@ -0,0 +1,133 @@
+"""Deterministic, counter-based random streams.
+
+Every random number in a run is a pure function of (seed, player id,
+roll type, counter): the three keys are hashed with the SplitMix64
+finalizer into a stream key, and the n-th value of a stream is the
+finalizer applied to key + n * golden gamma. Nothing depends on the order
+in which players or roll types are drawn, so
+
+* a seeded run is reproducible bit for bit,
+* running players in a different order, in separate processes or alone
+  gives each of them the same numbers, and
+* the same player and roll type lines up across two configurations
+  (common random numbers).
+
+Antithetic streams return 1 - u for every value of the regular stream,
+so a run and its antithetic twin are negatively correlated.
+
+Game and CohortEngine derive their numbers the same way, one stream per
+roll type in STREAMS.
+"""
+import secrets
+from array import array
+
+import numpy as np
+
+STREAMS = ('action', 'tier', 'win', 'loot', 'material', 'pet', 'contract_material', 'lootbox_loot', 'lootbox_pet')
+STREAM_INDEX = {name: i for i, name in enumerate(STREAMS)}
+
+_MASK = (1 << 64) - 1
+_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MUL_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MUL_2 = np.uint64(0x94D049BB133111EB)
+_TO_UNIT = 2.0 ** -53
+
+# Blocks start small and double up to BLOCK_SIZE, so a rarely used stream holds only a few values
+FIRST_BLOCK = 4
+BLOCK_SIZE = 64
+
+
+def new_seed():
+    """Random 64-bit seed for runs that were not given one."""
+    return secrets.randbits(64)
+
+
+def _mix(z):
+    """SplitMix64 finalizer on a uint64 array (wrapping arithmetic)."""
+    z = (z ^ (z >> np.uint64(30))) * _MUL_1
+    z = (z ^ (z >> np.uint64(27))) * _MUL_2
+    return z ^ (z >> np.uint64(31))
+
+
+def stream_keys(seed, player_ids):
+    """(players, len(STREAMS)) array of stream keys."""
+    with np.errstate(over='ignore'):
+        seed_key = _mix(np.array([seed & _MASK], dtype=np.uint64) + _GAMMA)
+        players = np.asarray(player_ids, dtype=np.uint64)
+        player_keys = _mix(seed_key + (players + np.uint64(1)) * _GAMMA)
+        streams = np.arange(1, len(STREAMS) + 1, dtype=np.uint64)
+        return _mix(player_keys[:, None] + streams[None, :] * _GAMMA)
+
+
+def uniforms_at(keys, counters, antithetic=False):
+    """Uniform [0, 1) value at the given counter of each stream key (element-wise).
+
+    With antithetic, 1 - u instead (in (0, 1]).
+    """
+    with np.errstate(over='ignore'):
+        z = _mix(np.asarray(keys, dtype=np.uint64) + (np.asarray(counters, dtype=np.uint64) + np.uint64(1)) * _GAMMA)
+    u = (z >> np.uint64(11)).astype(np.float64) * _TO_UNIT
+    return 1.0 - u if antithetic else u
+
+
+class CounterStream:
+    """One roll type's stream for one player.
+
+    random() serves values from a pre-computed block of doubles that grows
+    with use; take(n) returns the next n values as an array and is
+    interchangeable with n random() calls. Pickles as just (key, counter).
+    """
+    __slots__ = ('key', 'block_size', 'antithetic', '_start', '_block', '_pos', '_next_size')
+
+    def __init__(self, key, counter=0, block_size=BLOCK_SIZE, antithetic=False):
+        self.key = np.uint64(key)
+        self.block_size = block_size
+        self.antithetic = antithetic
+        self._start = counter  # Counter of the first value in the current block
+        self._block = array('d')
+        self._pos = 0
+        self._next_size = min(FIRST_BLOCK, block_size)
+
+    @property
+    def counter(self):
+        """Number of values consumed so far."""
+        return self._start + self._pos
+
+    def random(self):
+        if self._pos == len(self._block):
+            self._start += self._pos
+            self._block = array('d', self._compute(self._start, self._next_size).tobytes())
+            self._pos = 0
+            self._next_size = min(2 * self._next_size, self.block_size)
+        value = self._block[self._pos]
+        self._pos += 1
+        return value
+
+    def take(self, n):
+        """The next n values as an array."""
+        start = self.counter
+        values = self._compute(start, n)
+        # The rest of the current block is dropped; it is recomputed on demand
+        self._start, self._block, self._pos = start + n, array('d'), 0
+        return values
+
+    def _compute(self, start, n):
+        return uniforms_at(np.full(n, self.key), np.arange(start, start + n, dtype=np.uint64), self.antithetic)
+
+    def __getstate__(self):
+        return {'key': int(self.key), 'counter': self.counter, 'block_size': self.block_size,
+                'antithetic': self.antithetic}
+
+    def __setstate__(self, state):
+        self.__init__(state['key'], state['counter'], state['block_size'], state.get('antithetic', False))
+
+
+class PlayerStreams:
+    """All roll-type streams of one player, as attributes named after STREAMS."""
+    def __init__(self, seed, player_id, antithetic=False):
+        keys = stream_keys(seed, [player_id])[0]
+        for name, key in zip(STREAMS, keys):
+            setattr(self, name, CounterStream(key, antithetic=antithetic))
+
+    def counters(self):
+        return {name: getattr(self, name).counter for name in STREAMS}
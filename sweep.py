@@ -0,0 +1,177 @@
+"""Multi-process parameter sweeps.
+
+A sweep takes a base scenario (see simulate.py), a set of parameters
+addressed by dotted path into the scenario ("gear_bonus_values.legendary",
+"dungeon_win_probabilities.2", "dungeon_choice.tier_3.gear_modifier") and
+expands them into configurations. A path changes a single entry: the
+other entries of its table keep their scenario or default values.
+
+    grid    every combination of the listed values
+    random  independent uniform draws in [low, high]
+    lhs     Latin hypercube sample in [low, high]
+
+Each configuration is run for a number of replicates. Every job gets its
+own seed spawned from one root SeedSequence, so results don't depend on
+which worker runs which job. Jobs are spread over a process pool and the
+per-job metrics are aggregated into one table with a row per
+configuration (mean and standard deviation over replicates).
+
+Sweep file:
+
+    {
+        "base": "scenario.json",          (or an inline scenario dict)
+        "method": "grid",
+        "parameters": {"gear_bonus_values.legendary": [0.03, 0.05, 0.07]},
+        "replicates": 4,
+        "seed": 1,
+        "engine": "game"
+    }
+
+For random/lhs use {"low": 0.0, "high": 0.1} per parameter and "samples".
+
+Usage:
+    python -m sweep sweep.json -o sweep.csv [--workers 8]
+"""
+import argparse
+import copy
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from events import OFF
+from simulate import load_scenario, run_scenario, run_cohort_scenario, game_metrics, cohort_metrics
+
+
+def set_path(scenario, path, value):
+    """Set a dotted-path value in a nested scenario dict, creating levels as needed."""
+    keys = path.split('.')
+    node = scenario
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+
+def grid_points(parameters):
+    """Every combination of the listed values."""
+    names = list(parameters)
+    return [dict(zip(names, values)) for values in itertools.product(*(parameters[name] for name in names))]
+
+
+def random_points(parameters, samples, rng):
+    """Independent uniform draws for each parameter."""
+    columns = {name: rng.uniform(bounds['low'], bounds['high'], samples) for name, bounds in parameters.items()}
+    return [{name: float(columns[name][i]) for name in parameters} for i in range(samples)]
+
+
+def lhs_points(parameters, samples, rng):
+    """Latin hypercube sample: each parameter hits every 1/samples stratum once."""
+    columns = {}
+    for name, bounds in parameters.items():
+        strata = (rng.permutation(samples) + rng.random(samples)) / samples
+        columns[name] = bounds['low'] + strata * (bounds['high'] - bounds['low'])
+    return [{name: float(columns[name][i]) for name in parameters} for i in range(samples)]
+
+
+def expand(sweep, rng):
+    """Configurations (parameter dicts) described by a sweep spec."""
+    method = sweep.get('method', 'grid')
+    parameters = sweep['parameters']
+    if method == 'grid':
+        return grid_points(parameters)
+    if method == 'random':
+        return random_points(parameters, sweep['samples'], rng)
+    if method == 'lhs':
+        return lhs_points(parameters, sweep['samples'], rng)
+    raise ValueError(f"Unknown sweep method: {method}")
+
+
+def make_jobs(base, points, replicates, seed):
+    """One job per (configuration, replicate), each with an independent seed."""
+    children = np.random.SeedSequence(seed).spawn(len(points) * replicates)
+    jobs = []
+    for config_id, point in enumerate(points):
+        scenario = copy.deepcopy(base)
+        for path, value in point.items():
+            set_path(scenario, path, value)
+        for replicate in range(replicates):
+            child = children[config_id * replicates + replicate]
+            job_seed = int(child.generate_state(1, dtype=np.uint64)[0])
+            jobs.append((config_id, replicate, job_seed, scenario))
+    return jobs
+
+
+def run_job(job, engine='game'):
+    """Run one job in a worker and return its metrics row."""
+    config_id, replicate, seed, scenario = job
+    scenario = copy.deepcopy(scenario)
+    scenario.setdefault('simulation_settings', {})['seed'] = seed
+    if engine == 'cohort':
+        metrics = cohort_metrics(run_cohort_scenario(scenario))
+    else:
+        metrics = game_metrics(run_scenario(scenario, log_level=OFF))
+    return {'config_id': config_id, 'replicate': replicate, 'seed': seed, **metrics}
+
+
+def _run_chunk(args):
+    jobs, engine = args
+    return [run_job(job, engine) for job in jobs]
+
+
+def run_jobs(jobs, engine='game', workers=None):
+    """Run jobs across a process pool; returns one metrics row per job, in job order."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [run_job(job, engine) for job in jobs]
+    # A few chunks per worker keeps pickling overhead low while balancing load
+    chunk = max(1, len(jobs) // (workers * 4))
+    chunks = [(jobs[i:i + chunk], engine) for i in range(0, len(jobs), chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [row for rows in pool.map(_run_chunk, chunks) for row in rows]
+
+
+def aggregate(points, rows):
+    """One row per configuration: parameter values plus mean/std of each metric."""
+    import pandas as pd
+
+    results = pd.DataFrame(rows)
+    metrics = [column for column in results.columns if column not in ('config_id', 'replicate', 'seed')]
+    summary = results.groupby('config_id')[metrics].agg(['mean', 'std'])
+    summary.columns = [f"{metric}_{stat}" for metric, stat in summary.columns]
+    summary.insert(0, 'replicates', results.groupby('config_id').size())
+    parameters = pd.DataFrame(points)
+    parameters.index.name = 'config_id'
+    return parameters.join(summary).reset_index()
+
+
+def run_sweep(sweep, workers=None):
+    """Expand, run and aggregate a sweep spec; returns (table, raw rows)."""
+    base = sweep.get('base', {})
+    if isinstance(base, str):
+        base = load_scenario(base)
+    seed = sweep.get('seed', 0)
+    points = expand(sweep, np.random.default_rng(seed))
+    jobs = make_jobs(base, points, sweep.get('replicates', 1), seed)
+    rows = run_jobs(jobs, engine=sweep.get('engine', 'game'), workers=workers)
+    return aggregate(points, rows), rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a parameter sweep across a process pool.")
+    parser.add_argument('sweep', help="Sweep JSON file")
+    parser.add_argument('-o', '--out', default='sweep.csv', help="Aggregated results CSV")
+    parser.add_argument('--raw', default=None, help="Optional CSV with one row per job")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    table, rows = run_sweep(load_scenario(args.sweep), workers=args.workers)
+    table.to_csv(args.out, index=False)
+    if args.raw:
+        import pandas as pd
+        pd.DataFrame(rows).to_csv(args.raw, index=False)
+    print(f"{len(table)} configurations, {len(rows)} jobs -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
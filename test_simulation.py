@@ -0,0 +1,156 @@
+"""Checks of the guarantees the simulation code relies on.
+
+Run with: python -m pytest -q
+"""
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import checkpoint
+import events
+from classes import Game, Player
+from config import Config
+from engine import CohortEngine
+from simulate import build_game, game_summary, run_cohort_scenario, run_scenario
+from sweep import set_path
+
+SCHEDULES = [(1.0, 1), (0.5, 2), (0.3, 3), (0.7, 1), (0.2, 5), (0.0, 1), (0.9, 4)]
+
+
+def scenario(days=20, seed=7, rounds_per_day=10, copies=1):
+    players = [{'name': f"P{i}", 'activity_level': activity, 'play_frequency': frequency}
+               for i, (activity, frequency) in enumerate(SCHEDULES * copies)]
+    return {'simulation_settings': {'simulation_days': days, 'seed': seed, 'rounds_per_day': rounds_per_day},
+            'players': players}
+
+
+def series(game):
+    return [(player.recorder.column('turns').tolist(), player.recorder.column('gear_levels').tolist(),
+             player.recorder.column('win_rates').tolist()) for player in game.players]
+
+
+def test_event_driven_matches_round_loop():
+    for rounds_per_day, record_every in [(7, 1), (10, 'day'), (6, 4)]:
+        games = []
+        for event_driven in (True, False):
+            config = Config()
+            players = [Player(f"p{i}", config, activity_level=activity, play_frequency=frequency)
+                       for i, (activity, frequency) in enumerate(SCHEDULES)]
+            game = Game(players, config, rounds_per_day=rounds_per_day, seed=42, record_every=record_every,
+                        log_level=events.ACTIONS, event_driven=event_driven)
+            game.run(days=23)
+            games.append(game)
+        fast, slow = games
+        assert game_summary(fast) == game_summary(slow)
+        assert series(fast) == series(slow)
+        assert list(fast.action_log) == list(slow.action_log)
+
+
+def test_cohort_engine_matches_game():
+    settings = scenario(days=30, seed=11, copies=3)
+    game = run_scenario(settings, events.OFF)
+    final = run_cohort_scenario(settings).final_state()
+    for i, player in enumerate(game.players):
+        assert final['gear_level'][i] == player.gear_level
+        assert final['yoku'][i] == player.yoku
+        assert final['skull_tokens'][i] == player.skull_tokens
+        assert final['lootboxes_opened'][i] == player.lootboxes_opened
+        assert final['pets'][i] == len(player.pets)
+
+
+def test_cohort_engine_split_matches_whole():
+    config = Config()
+    activity = np.array([activity for activity, _ in SCHEDULES] * 5)
+    frequency = np.array([frequency for _, frequency in SCHEDULES] * 5)
+    whole = CohortEngine(config, activity, frequency, seed=5)
+    whole.run(20)
+    first = CohortEngine(config, activity[:12], frequency[:12], seed=5)
+    first.run(20)
+    rest = CohortEngine(config, activity[12:], frequency[12:], seed=5, player_ids=np.arange(12, len(activity)))
+    rest.run(20)
+    for name, values in whole.final_state().items():
+        assert (values == np.concatenate([first.final_state()[name], rest.final_state()[name]])).all(), name
+
+
+def test_checkpoint_resume_reproduces_run(tmp_path):
+    settings = scenario(days=12, rounds_per_day=24)
+    full = build_game(settings, events.DEBUG)
+    full.run(12)
+
+    path = str(tmp_path / 'checkpoint.bin')
+    saved = build_game(settings, events.DEBUG)
+    saved.run(5, checkpoint_every=2, checkpoint_path=path)
+    resumed = checkpoint.load(path)
+    resumed.run(12)
+
+    # Stopped in the middle of a day
+    mid_day = build_game(settings, events.DEBUG)
+    mid_day.run(3)
+    for _ in range(7):
+        mid_day.play_round()
+    mid_day = checkpoint.loads(checkpoint.dumps(mid_day))
+    mid_day.run(12)
+
+    for game in (resumed, mid_day):
+        assert game_summary(game) == game_summary(full)
+        assert series(game) == series(full)
+        assert list(game.action_log) == list(full.action_log)
+
+
+def test_fork_continues_without_touching_original():
+    game = build_game(scenario(days=8), events.OFF)
+    game.run(8)
+    before = game_summary(game)
+    longer = checkpoint.fork(game)
+    longer.run(12)
+    assert game_summary(game) == before
+
+    direct = build_game(scenario(days=12), events.OFF)
+    direct.run(12)
+    assert game_summary(longer) == game_summary(direct)
+
+
+def test_single_player_run_matches_full_run():
+    settings = scenario(days=15)
+    full = game_summary(run_scenario(settings, events.OFF))
+    for i in (0, 3):
+        alone = game_summary(run_scenario(settings, events.OFF, only=[i]))
+        assert alone['players'][0] == full['players'][i]
+
+
+def test_fingerprint_is_stable():
+    config = Config()
+    config.update_from_user_input({'dungeon_win_probabilities': {'2': 0.5}})
+    same = Config()
+    same.update_from_user_input({'dungeon_win_probabilities': {2: 0.5}})
+    assert config.compile().fingerprint == same.compile().fingerprint
+    assert config.compile().fingerprint != Config().compile().fingerprint
+
+    # Same value in a fresh interpreter with another hash seed
+    code = ("from config import Config; c = Config(); "
+            "c.update_from_user_input({'dungeon_win_probabilities': {'2': 0.5}}); print(c.compile().fingerprint)")
+    env = {**os.environ, 'PYTHONHASHSEED': '123', 'PYTHONPATH': os.path.dirname(os.path.abspath(__file__))}
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == config.compile().fingerprint
+
+
+def test_partial_tables_merge_into_defaults():
+    defaults = Config()
+    for path, value in [('gear_bonus_values.legendary', 0.07), ('dungeon_win_probabilities.2', 0.4),
+                        ('dungeon_loot_drop_chances.1.legendary', 0.5)]:
+        settings = {}
+        set_path(settings, path, value)
+        config = Config()
+        config.update_from_user_input(settings)
+        config.compile()
+        table, *keys = path.split('.')
+        merged, default = getattr(config, table), getattr(defaults, table)
+        if table.startswith('dungeon_'):
+            keys[0] = int(keys[0])
+        if len(keys) == 2:
+            merged, default = merged[keys[0]], default[keys[0]]
+        assert merged[keys[-1]] == value
+        assert {key: chance for key, chance in merged.items() if key != keys[-1]} \
+            == {key: chance for key, chance in default.items() if key != keys[-1]}